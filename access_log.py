@@ -0,0 +1,205 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+
+_push_lock = threading.Lock()
+_last_push_time = 0
+_last_rand_chars = [0] * 12
+
+
+def generate_push_id():
+    """
+    Generate key dengan format yang sama seperti RTDB push() (urut berdasarkan waktu),
+    supaya log bisa ditulis lewat multi-path update tanpa round trip push().
+    """
+    global _last_push_time, _last_rand_chars
+
+    with _push_lock:
+        now = int(time.time() * 1000)
+        duplicate_time = now == _last_push_time
+        _last_push_time = now
+
+        time_chars = []
+        for _ in range(8):
+            time_chars.append(PUSH_CHARS[now % 64])
+            now //= 64
+        push_id = ''.join(reversed(time_chars))
+
+        if not duplicate_time:
+            _last_rand_chars = [random.randrange(64) for _ in range(12)]
+        else:
+            # Timestamp sama, increment random chars supaya tetap unik dan urut
+            i = 11
+            while i >= 0 and _last_rand_chars[i] == 63:
+                _last_rand_chars[i] = 0
+                i -= 1
+            if i >= 0:
+                _last_rand_chars[i] += 1
+
+        return push_id + ''.join(PUSH_CHARS[c] for c in _last_rand_chars)
+
+
+class AccessLogWriter:
+    """
+    Write-behind queue untuk access logs.
+
+    write() hanya memasukkan entry ke queue (bounded) lalu langsung return,
+    sehingga keputusan unlock tidak menunggu Firebase. Background thread
+    mengumpulkan entries dan menulisnya sebagai satu multi-path update.
+    Kalau Firebase lambat/tidak bisa dihubungi (atau queue penuh), entries
+    disimpan ke spool file lokal (JSONL) dan di-replay setelah koneksi pulih.
+    """
+
+    def __init__(self, logs_ref, spool_path, max_queue=10000, batch_size=100,
+                 flush_interval=0.5, retry_interval=5.0):
+        self._ref = logs_ref
+        self._spool_path = spool_path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._retry_interval = retry_interval
+        self._spool_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._retry_at = 0
+        self._spool_count = 0
+        # Jumlah entry yang sudah di-enqueue tapi belum ditulis/di-spool (untuk flush())
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._stats = {'written': 0, 'spooled': 0, 'failed_flushes': 0}
+
+    def start(self):
+        if os.path.exists(self._spool_path):
+            with open(self._spool_path) as f:
+                self._spool_count = sum(1 for line in f if line.strip())
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop flusher, sisa queue di-flush atau di-spool ke disk"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        remaining = self._drain(self._queue.qsize())
+        if remaining:
+            self._spool(remaining)
+            self._done(len(remaining))
+
+    def write(self, log_data):
+        """Enqueue satu log entry, return log_id. Tidak pernah block ke network."""
+        log_id = generate_push_id()
+        with self._idle:
+            self._pending += 1
+        try:
+            self._queue.put_nowait((log_id, log_data))
+        except queue.Full:
+            self._spool([(log_id, log_data)])
+            self._done(1)
+        return log_id
+
+    def flush(self, timeout=5.0):
+        """
+        Tunggu sampai semua entry yang sudah di-write() ditulis ke storage
+        (atau di-spool). Return False kalau timeout.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def spooled(self):
+        """List (log_id, log_data) yang masih di spool file, belum sampai ke storage"""
+        with self._spool_lock:
+            if not os.path.exists(self._spool_path):
+                return []
+            with open(self._spool_path) as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+        return [(e['log_id'], e['data']) for e in entries]
+
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize(),
+            'spool_depth': self._spool_count,
+            **self._stats
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self._flush_interval)
+            except queue.Empty:
+                self._replay_spool()
+                continue
+
+            batch = [first] + self._drain(self._batch_size - 1)
+            if time.monotonic() < self._retry_at:
+                # Masih backoff setelah gagal, langsung ke spool
+                self._spool(batch)
+                self._done(len(batch))
+            elif self._flush(batch):
+                self._done(len(batch))
+                self._replay_spool()
+            else:
+                self._spool(batch)
+                self._done(len(batch))
+
+    def _done(self, count):
+        with self._idle:
+            self._pending -= count
+            self._idle.notify_all()
+
+    def _drain(self, limit):
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _flush(self, batch):
+        try:
+            self._ref.update({log_id: log_data for log_id, log_data in batch})
+            self._stats['written'] += len(batch)
+            return True
+        except Exception as e:
+            print(f"Error writing access logs, spooling {len(batch)} entries: {e}")
+            self._stats['failed_flushes'] += 1
+            self._retry_at = time.monotonic() + self._retry_interval
+            return False
+
+    def _spool(self, batch):
+        with self._spool_lock:
+            with open(self._spool_path, 'a') as f:
+                for log_id, log_data in batch:
+                    f.write(json.dumps({'log_id': log_id, 'data': log_data}) + '\n')
+            self._spool_count += len(batch)
+        self._stats['spooled'] += len(batch)
+
+    def _replay_spool(self):
+        """Kirim ulang entries dari spool file dalam batch"""
+        if time.monotonic() < self._retry_at:
+            return
+
+        with self._spool_lock:
+            if not os.path.exists(self._spool_path):
+                return
+            with open(self._spool_path) as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+
+            for i in range(0, len(entries), self._batch_size):
+                chunk = entries[i:i + self._batch_size]
+                if not self._flush([(e['log_id'], e['data']) for e in chunk]):
+                    # Simpan sisanya, coba lagi nanti
+                    with open(self._spool_path, 'w') as f:
+                        for e in entries[i:]:
+                            f.write(json.dumps(e) + '\n')
+                    self._spool_count = len(entries) - i
+                    return
+
+            os.remove(self._spool_path)
+            self._spool_count = 0
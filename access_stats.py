@@ -0,0 +1,183 @@
+import threading
+from datetime import datetime, timedelta
+
+# Granularity -> (panjang prefix timestamp ISO, jumlah bucket yang disimpan)
+GRANULARITIES = {
+    'minute': (16, 24 * 60),
+    'hour': (13, 30 * 24),
+    'day': (10, 365),
+}
+
+# Panjang satu bucket per granularity
+_STEPS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+
+def _empty_bucket():
+    return {'total': 0, 'authorized': 0, 'denied': 0, 'methods': {}, 'users': {}}
+
+
+def _add(bucket, log_data, method, user_id):
+    authorized = bool(log_data.get('authorized'))
+    bucket['total'] += 1
+    bucket['authorized' if authorized else 'denied'] += 1
+    bucket['methods'][method] = bucket['methods'].get(method, 0) + 1
+
+    user = bucket['users'].get(user_id)
+    if user is None:
+        user = bucket['users'][user_id] = {'name': log_data.get('user_name', ''), 'authorized': 0, 'denied': 0}
+    user['authorized' if authorized else 'denied'] += 1
+
+
+class AccessStats:
+    """
+    Agregat access log yang di-update incremental setiap entry ditulis.
+
+    Per granularity (minute/hour/day) disimpan bucket dengan key prefix
+    timestamp ISO (misalnya '2025-01-01T13' untuk jam), berisi jumlah
+    total/authorized/denied, per method (face/PIN) dan per user. Jumlah
+    bucket dibatasi (lihat GRANULARITIES), jadi query tidak tergantung
+    panjang history. Semua agregat bisa dibangun ulang dari raw log
+    dengan rebuild().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        # log_id -> log_data yang di-record selama rebuild berjalan (None kalau tidak rebuild)
+        self._deltas = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._series = {granularity: {} for granularity in GRANULARITIES}
+            self._totals = _empty_bucket()
+
+    def record(self, log_data, log_id=None):
+        """Tambahkan satu entry access log ke semua agregat"""
+        with self._lock:
+            if self._deltas is not None:
+                self._deltas[log_id or object()] = log_data
+            self._record(log_data)
+
+    def _record(self, log_data):
+        timestamp = log_data.get('timestamp')
+        if not timestamp:
+            return
+        method = log_data.get('method', 'face')
+        user_id = log_data.get('user_id', 'unknown')
+
+        _add(self._totals, log_data, method, user_id)
+        for granularity, (prefix, keep) in GRANULARITIES.items():
+            series = self._series[granularity]
+            key = timestamp[:prefix]
+            bucket = series.get(key)
+            if bucket is None:
+                bucket = series[key] = _empty_bucket()
+                if len(series) > keep:
+                    del series[min(series)]
+            _add(bucket, log_data, method, user_id)
+
+    def rebuild(self, load):
+        """
+        Hitung ulang semua agregat dari raw log. load() dipanggil setelah
+        rebuild mulai mencatat entry baru, dan harus return iterable
+        (log_id, log_data). Agregat baru dibangun terpisah lalu di-swap, jadi
+        /api/stats tetap bisa dibaca selama rebuild; entry yang di-record
+        selama rebuild (dan belum ada di hasil load) ikut digabung.
+        Log dengan log_id yang sama hanya dihitung sekali. Return jumlah log.
+        """
+        with self._rebuild_lock:
+            with self._lock:
+                self._deltas = {}
+            try:
+                fresh = AccessStats()
+                seen = set()
+                for log_id, log_data in load():
+                    if log_id not in seen and isinstance(log_data, dict):
+                        seen.add(log_id)
+                        fresh._record(log_data)
+            except Exception:
+                with self._lock:
+                    self._deltas = None
+                raise
+
+            with self._lock:
+                deltas, self._deltas = self._deltas, None
+                for log_id, log_data in deltas.items():
+                    if log_id not in seen:
+                        fresh._record(log_data)
+                self._series = fresh._series
+                self._totals = fresh._totals
+                return fresh._totals['total']
+
+    def summary(self, granularity='hour', window=24, top=5, now=None):
+        """
+        Statistik untuk window periode terakhir sampai now (termasuk periode
+        yang sedang berjalan): series per bucket (periode kosong diisi 0),
+        total per method, top users (authorized terbanyak) dan total
+        sepanjang waktu.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+
+        prefix = GRANULARITIES[granularity][0]
+        now = now or datetime.now()
+        keys = [(now - _STEPS[granularity] * i).isoformat()[:prefix] for i in reversed(range(window))]
+
+        with self._lock:
+            series = self._series[granularity]
+            buckets = [(key, series.get(key) or _empty_bucket()) for key in keys]
+
+            window_totals = _empty_bucket()
+            for _, bucket in buckets:
+                for field in ('total', 'authorized', 'denied'):
+                    window_totals[field] += bucket[field]
+                for method, count in bucket['methods'].items():
+                    window_totals['methods'][method] = window_totals['methods'].get(method, 0) + count
+                for user_id, user in bucket['users'].items():
+                    merged = window_totals['users'].setdefault(
+                        user_id, {'name': user['name'], 'authorized': 0, 'denied': 0}
+                    )
+                    merged['authorized'] += user['authorized']
+                    merged['denied'] += user['denied']
+
+            top_users = sorted(
+                (
+                    {'user_id': user_id, **user}
+                    for user_id, user in window_totals['users'].items()
+                    if user_id != 'unknown' and user['authorized']
+                ),
+                key=lambda user: user['authorized'],
+                reverse=True
+            )[:top]
+
+            return {
+                'granularity': granularity,
+                'series': [
+                    {
+                        'bucket': key,
+                        'total': bucket['total'],
+                        'authorized': bucket['authorized'],
+                        'denied': bucket['denied'],
+                        'methods': dict(bucket['methods'])
+                    }
+                    for key, bucket in buckets
+                ],
+                'window': {
+                    'total': window_totals['total'],
+                    'authorized': window_totals['authorized'],
+                    'denied': window_totals['denied'],
+                    'methods': window_totals['methods'],
+                    'top_users': top_users
+                },
+                'all_time': {
+                    'total': self._totals['total'],
+                    'authorized': self._totals['authorized'],
+                    'denied': self._totals['denied'],
+                    'methods': dict(self._totals['methods'])
+                }
+            }
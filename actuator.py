@@ -0,0 +1,107 @@
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ActuatorDispatcher:
+    """
+    Kirim perintah ke ESP8266 di background thread: GET <base_url>/<command>,
+    atau POST JSON kalau perintah punya payload (misalnya /unlock dengan
+    method face di firmware esp8266_full_code).
+
+    dispatch() hanya memasukkan perintah ke queue lalu langsung return, jadi
+    response ke kamera tidak pernah menunggu door hardware. Koneksi ke
+    ESP8266 di-reuse lewat requests.Session (keep-alive) dengan timeout
+    connect/read yang ketat. Perintah yang gagal di-retry beberapa kali,
+    perintah yang sudah terlalu lama di queue dibuang, dan perintah yang sama
+    dalam dedupe_window (misalnya unlock berulang dari frame berturut-turut)
+    hanya dikirim sekali.
+    """
+
+    def __init__(self, base_url, timeout=(0.5, 1.0), retries=2, retry_backoff=0.2,
+                 dedupe_window=3.0, max_age=5.0, max_queue=16):
+        self._base_url = base_url.rstrip("/")
+        self._timeout = timeout
+        self._retries = retries
+        self._retry_backoff = retry_backoff
+        self._dedupe_window = dedupe_window
+        self._max_age = max_age
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._last_sent = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {"sent": 0, "failed": 0, "retried": 0, "deduplicated": 0, "dropped": 0}
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=0)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._session.close()
+
+    def dispatch(self, command, payload=None):
+        """Antrikan perintah, return False kalau di-dedupe atau queue penuh"""
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_sent.get(command)
+            if last is not None and now - last < self._dedupe_window:
+                self._stats["deduplicated"] += 1
+                return False
+            self._last_sent[command] = now
+
+        try:
+            self._queue.put_nowait((command, payload, now))
+            return True
+        except queue.Full:
+            self._stats["dropped"] += 1
+            return False
+
+    def stats(self):
+        return {**self._stats, "pending": self._queue.qsize()}
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                command, payload, queued_at = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self._send(command, payload, queued_at)
+
+    def _send(self, command, payload, queued_at):
+        url = f"{self._base_url}/{command}"
+        for attempt in range(self._retries + 1):
+            if time.monotonic() - queued_at > self._max_age:
+                # Unlock yang terlambat lebih berbahaya daripada tidak terkirim
+                print(f"Dropping stale actuator command: {command}")
+                self._stats["dropped"] += 1
+                return
+            try:
+                if payload is None:
+                    response = self._session.get(url, timeout=self._timeout)
+                else:
+                    response = self._session.post(url, json=payload, timeout=self._timeout)
+                response.raise_for_status()
+                self._stats["sent"] += 1
+                return
+            except requests.RequestException as e:
+                print(f"Actuator command {command} failed (attempt {attempt + 1}): {e}")
+                if attempt < self._retries:
+                    self._stats["retried"] += 1
+                    time.sleep(self._retry_backoff * (attempt + 1))
+
+        self._stats["failed"] += 1
+        with self._lock:
+            # Jangan blok unlock berikutnya karena perintah ini tidak terkirim
+            self._last_sent.pop(command, None)
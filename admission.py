@@ -0,0 +1,111 @@
+import collections
+import threading
+import time
+from contextlib import contextmanager
+
+
+class AdmissionRejected(Exception):
+    """Request ditolak admission control; reason: 'overloaded', 'deadline' atau 'superseded'"""
+
+    def __init__(self, reason, retry_after=1):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ('source', 'state')
+
+    def __init__(self, source):
+        self.source = source
+        self.state = 'waiting'
+
+
+class AdmissionController:
+    """
+    Batasi jumlah request yang masuk ke recognition pipeline.
+
+    Maksimal max_active request diproses bersamaan; sisanya menunggu di queue
+    FIFO yang dibatasi max_waiting. Request yang menunggu lebih lama dari
+    timeout ditolak (deadline). Per kamera hanya frame terbaru yang boleh
+    menunggu: frame baru dari source yang sama menggantikan frame lama di
+    queue (latest frame wins), jadi queue tidak tumbuh karena snapshot basi.
+    """
+
+    def __init__(self, max_active=8, max_waiting=16, timeout=2.0, retry_after=1):
+        self._max_active = max_active
+        self._max_waiting = max_waiting
+        self._timeout = timeout
+        self._retry_after = retry_after
+        self._cond = threading.Condition()
+        self._active = 0
+        self._queue = collections.deque()
+        self._waiting = {}
+        self._stats = {'admitted': 0, 'overloaded': 0, 'deadline': 0, 'superseded': 0}
+
+    @contextmanager
+    def admit(self, source):
+        """
+        Context manager yang menunggu slot lalu melepasnya setelah selesai.
+        Raise AdmissionRejected kalau request ditolak. Return waktu tunggu (detik).
+        """
+        waited = self._acquire(source)
+        try:
+            yield waited
+        finally:
+            self._release()
+
+    def stats(self):
+        with self._cond:
+            return {**self._stats, 'active': self._active, 'waiting': len(self._queue)}
+
+    def _acquire(self, source):
+        start = time.monotonic()
+        with self._cond:
+            if self._active < self._max_active and not self._queue:
+                self._active += 1
+                self._stats['admitted'] += 1
+                return 0.0
+
+            previous = self._waiting.get(source)
+            if previous is None and len(self._queue) >= self._max_waiting:
+                self._stats['overloaded'] += 1
+                raise AdmissionRejected('overloaded', self._retry_after)
+
+            if previous is not None:
+                # Frame lama dari kamera yang sama sudah tidak berguna
+                previous.state = 'superseded'
+                self._queue.remove(previous)
+                self._cond.notify_all()
+
+            ticket = _Ticket(source)
+            self._queue.append(ticket)
+            self._waiting[source] = ticket
+
+            deadline = start + self._timeout
+            while ticket.state == 'waiting':
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queue.remove(ticket)
+                    self._waiting.pop(source, None)
+                    self._stats['deadline'] += 1
+                    raise AdmissionRejected('deadline', self._retry_after)
+                self._cond.wait(remaining)
+
+            if ticket.state == 'superseded':
+                self._stats['superseded'] += 1
+                raise AdmissionRejected('superseded', self._retry_after)
+
+            self._stats['admitted'] += 1
+            return time.monotonic() - start
+
+    def _release(self):
+        with self._cond:
+            self._active -= 1
+            while self._queue and self._active < self._max_active:
+                ticket = self._queue.popleft()
+                if self._waiting.get(ticket.source) is ticket:
+                    del self._waiting[ticket.source]
+                ticket.state = 'admitted'
+                self._active += 1
+            self._cond.notify_all()
@@ -0,0 +1,212 @@
+import os
+
+import numpy as np
+
+
+class IVFIndex:
+    """
+    Inverted-file index (IVF-Flat) pure NumPy untuk face encodings 128-d.
+
+    Vectors dikelompokkan ke `nlist` cluster hasil k-means. Search hanya
+    memeriksa `nprobe` cluster terdekat, lalu menghitung distance exact ke
+    semua kandidat di cluster tersebut (vector asli disimpan di tiap list),
+    sehingga hasil akhirnya bisa langsung dibandingkan dengan TOLERANCE.
+    """
+
+    def __init__(self, nlist=None, nprobe=8, dim=128):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.dim = dim
+        self.trained_size = 0
+        self._centroids = None
+        self._centroid_sq = None
+        self._list_vectors = []
+        self._list_keys = []
+        self._where = {}
+
+    @property
+    def trained(self):
+        return self._centroids is not None
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key):
+        return key in self._where
+
+    def needs_training(self, count, min_train=256, growth=4):
+        """True kalau index belum pernah di-train atau gallery sudah tumbuh jauh"""
+        if not self.trained:
+            return count >= min_train
+        return count > growth * self.trained_size
+
+    def train(self, vectors, iterations=10, seed=0):
+        """K-means (Lloyd) untuk centroids, lalu assign ulang semua vector yang ada"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n = len(vectors)
+        nlist = self.nlist or max(1, int(np.sqrt(n)))
+        nlist = min(nlist, n)
+
+        rng = np.random.default_rng(seed)
+        sample = vectors
+        if n > 256 * nlist:
+            sample = vectors[rng.choice(n, 256 * nlist, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = _nearest(sample, centroids, (centroids * centroids).sum(axis=1))
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+                else:
+                    # Cluster kosong, re-seed dari titik random
+                    centroids[c] = sample[rng.integers(len(sample))]
+
+        keys, existing = self._items()
+        self._centroids = centroids
+        self._centroid_sq = (centroids * centroids).sum(axis=1)
+        self.trained_size = n
+        self.clear()
+        if keys:
+            self.add_many(keys, existing)
+
+    def clear(self):
+        """Kosongkan semua inverted list (centroids tetap)"""
+        nlist = len(self._centroids) if self.trained else 0
+        self._list_vectors = [np.zeros((0, self.dim), dtype=np.float32) for _ in range(nlist)]
+        self._list_keys = [[] for _ in range(nlist)]
+        self._where = {}
+
+    def add(self, key, vector):
+        self.add_many([key], np.asarray(vector, dtype=np.float32).reshape(1, -1))
+
+    def add_many(self, keys, vectors):
+        if not self.trained:
+            raise RuntimeError("IVFIndex must be trained before adding vectors")
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        for key in keys:
+            if key in self._where:
+                self.remove(key)
+
+        assign = _nearest(vectors, self._centroids, self._centroid_sq)
+        for c in np.unique(assign):
+            members = np.flatnonzero(assign == c)
+            start = len(self._list_keys[c])
+            self._list_vectors[c] = np.concatenate([self._list_vectors[c], vectors[members]])
+            for offset, i in enumerate(members):
+                self._list_keys[c].append(keys[i])
+                self._where[keys[i]] = (c, start + offset)
+
+    def remove(self, key):
+        location = self._where.pop(key, None)
+        if location is None:
+            return
+
+        c, pos = location
+        keys = self._list_keys[c]
+        last = len(keys) - 1
+        if pos != last:
+            # Swap dengan elemen terakhir supaya list tetap rapat
+            self._list_vectors[c][pos] = self._list_vectors[c][last]
+            keys[pos] = keys[last]
+            self._where[keys[pos]] = (c, pos)
+        keys.pop()
+        self._list_vectors[c] = self._list_vectors[c][:last]
+
+    def sync(self, keys, vectors):
+        """
+        Samakan isi index dengan (keys, vectors) tanpa assign ulang yang
+        tidak berubah. Return True kalau ada perubahan.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        wanted = set(keys)
+        stale = [k for k in self._where if k not in wanted]
+        for key in stale:
+            self.remove(key)
+
+        changed = []
+        for i, key in enumerate(keys):
+            location = self._where.get(key)
+            if location is None or not np.array_equal(self._list_vectors[location[0]][location[1]], vectors[i]):
+                changed.append(i)
+        if changed:
+            self.add_many([keys[i] for i in changed], vectors[changed])
+        return bool(stale or changed)
+
+    def search(self, query, k=3, nprobe=None):
+        """Return list (key, distance) untuk k kandidat terdekat, urut ascending"""
+        query = np.asarray(query, dtype=np.float32)
+        nprobe = min(nprobe or self.nprobe, len(self._centroids))
+
+        centroid_dist = self._centroid_sq - 2.0 * (self._centroids @ query)
+        if nprobe < len(centroid_dist):
+            probe = np.argpartition(centroid_dist, nprobe - 1)[:nprobe]
+        else:
+            probe = np.arange(len(centroid_dist))
+
+        probe = [c for c in probe if self._list_keys[c]]
+        if not probe:
+            return []
+
+        candidates = np.concatenate([self._list_vectors[c] for c in probe])
+        keys = [key for c in probe for key in self._list_keys[c]]
+
+        # Exact re-rank ke semua kandidat dari cluster yang di-probe
+        diff = candidates - query
+        distances = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+
+        k = min(k, len(keys))
+        nearest = np.argpartition(distances, k - 1)[:k] if k < len(keys) else np.arange(len(keys))
+        nearest = nearest[np.argsort(distances[nearest])]
+        return [(keys[i], float(distances[i])) for i in nearest]
+
+    def save(self, path):
+        """Simpan centroids dan inverted lists ke file .npz (atomic replace)"""
+        keys, vectors = self._items()
+        lists = np.array([self._where[key][0] for key in keys], dtype=np.int32)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                centroids=self._centroids,
+                keys=np.array(keys, dtype=str),
+                vectors=vectors,
+                lists=lists,
+                meta=np.array([self.nprobe, self.trained_size, self.nlist or 0], dtype=np.int64)
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            centroids = data['centroids']
+            meta = data['meta']
+            index = cls(nlist=int(meta[2]) or None, nprobe=int(meta[0]), dim=centroids.shape[1])
+            index._centroids = centroids.astype(np.float32)
+            index._centroid_sq = (index._centroids * index._centroids).sum(axis=1)
+            index.trained_size = int(meta[1])
+            index.clear()
+
+            keys = data['keys'].tolist()
+            vectors = data['vectors'].astype(np.float32)
+            lists = data['lists']
+            for c in range(len(centroids)):
+                members = np.flatnonzero(lists == c)
+                index._list_vectors[c] = vectors[members]
+                index._list_keys[c] = [keys[i] for i in members]
+                for pos, i in enumerate(members):
+                    index._where[keys[i]] = (c, pos)
+        return index
+
+    def _items(self):
+        keys = [key for key_list in self._list_keys for key in key_list]
+        if not keys:
+            return [], np.zeros((0, self.dim), dtype=np.float32)
+        return keys, np.concatenate(self._list_vectors)
+
+
+def _nearest(vectors, centroids, centroid_sq):
+    """Index centroid terdekat untuk tiap baris vectors"""
+    return np.argmin(centroid_sq[None, :] - 2.0 * (vectors @ centroids.T), axis=1)
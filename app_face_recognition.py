@@ -1,93 +1,636 @@
-from flask import Flask, request, jsonify
+import time
+
+# Waktu mulai import, untuk laporan durasi startup di /api/health/ready
+PROCESS_STARTED = time.perf_counter()
+
+from flask import Flask, request, jsonify, g, Response
 from flask_cors import CORS
-import face_recognition
 import numpy as np
 import cv2
-import firebase_admin
-from firebase_admin import credentials, db
 import base64
 from datetime import datetime
 import os
 import tempfile
 import shutil
+import threading
+from itertools import chain
+from face_gallery import FaceGallery
+from ann_index import IVFIndex
+from access_log import AccessLogWriter, generate_push_id
+from access_stats import AccessStats, GRANULARITIES
+from log_archive import LogArchive, LogRetention
+from face_engine import get_face_encoding, get_face_encodings_batch
+from batch_scheduler import MicroBatcher
+from admission import AdmissionController, AdmissionRejected
+from stream_consumer import StreamConsumer
+from actuator import ActuatorDispatcher
+from frame_cache import FrameCache, difference_hash
+from frame_gate import FrameGate
+from pin_index import PinIndex
+from local_store import LocalStore, FirebaseReplicator
+from encoding_codec import pack_encoding
+import face_engine
+import metrics
+from metrics import InstrumentedReference, stage_timer
+from inference_pool import InferencePool
+from startup import Startup
+
+# Jumlah worker process untuk dlib inference (0 = jalan di thread request)
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))
+
+# Tahap startup: model dlib (face_recognition) dan sync Firebase tidak di-load saat import,
+# tapi di background thread setelah server live. Readiness di /api/health/ready
+startup = Startup(PROCESS_STARTED)
+
+# Pool dibuat sebelum Firebase dan background threads lain start (worker di-fork).
+# Warm-up worker jalan di background, readiness menunggu lewat step inference_pool
+inference_pool = InferencePool(INFERENCE_WORKERS) if INFERENCE_WORKERS > 0 else None
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
-# Initialize Firebase
-cred = credentials.Certificate('serviceAccountKey.json')
-firebase_admin.initialize_app(cred, {
-    'databaseURL': 'https://iot-rc-ef82d-default-rtdb.asia-southeast1.firebasedatabase.app/'
-})
+# Storage: 'local' (SQLite lokal + sync ke Firebase di background) atau 'firebase' (langsung ke RTDB)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+LOCAL_DB_PATH = os.environ.get('LOCAL_DB_PATH', 'face_server.db')
+FIREBASE_CREDENTIALS = os.environ.get('FIREBASE_CREDENTIALS', 'serviceAccountKey.json')
+
+# Firebase dipakai kalau backend firebase, atau backend local dengan service account
+# (backend local tetap jalan offline tanpa service account)
+firebase_enabled = STORAGE_BACKEND == 'firebase' or os.path.exists(FIREBASE_CREDENTIALS)
 
-# Reference ke Firebase RTDB
-users_ref = db.reference('users')
-logs_ref = db.reference('access_logs')
-pins_ref = db.reference('pins')
+def init_firebase():
+    """Import firebase_admin dan initialize app, return module db"""
+    import firebase_admin
+    from firebase_admin import credentials, db
+    
+    cred = credentials.Certificate(FIREBASE_CREDENTIALS)
+    firebase_admin.initialize_app(cred, {
+        'databaseURL': 'https://iot-rc-ef82d-default-rtdb.asia-southeast1.firebasedatabase.app/'
+    })
+    return db
+
+local_store = None
+replicator = None
+if STORAGE_BACKEND == 'local':
+    local_store = LocalStore(LOCAL_DB_PATH)
+    reference = local_store.reference
+    if not firebase_enabled:
+        print("Firebase credentials not found, running with local storage only")
+elif STORAGE_BACKEND == 'firebase':
+    reference = init_firebase().reference
+else:
+    raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+def start_firebase_sync():
+    """
+    Init Firebase, import users/pins/access_logs yang belum pernah di-bootstrap
+    (upgrade dari backend firebase), lalu start replicator
+    """
+    global replicator
+    db = init_firebase()
+    sync = FirebaseReplicator(local_store, InstrumentedReference(db.reference('/'), 'sync'))
+    if 'access_logs' in sync.bootstrap(['users', 'pins', 'access_logs']):
+        rebuild_access_stats()
+    sync.start()
+    replicator = sync
+
+# Reference ke storage (latency dan error tiap panggilan dicatat ke metrics)
+users_ref = InstrumentedReference(reference('users'))
+logs_ref = InstrumentedReference(reference('access_logs'))
+pins_ref = InstrumentedReference(reference('pins'))
 
 # Threshold untuk face recognition (0.6 is default, lower = more strict)
 TOLERANCE = 0.6
 
+# Format penyimpanan face_encoding: 'f32' atau 'f16' (packed base64, lihat encoding_codec)
+ENCODING_FORMAT = os.environ.get('ENCODING_FORMAT', 'f32')
+
+# Batas jumlah foto per request /api/register/bulk
+BULK_MAX_IMAGES = int(os.environ.get('BULK_MAX_IMAGES', 200))
+
 # Default PIN
 DEFAULT_PIN = "0000"
 
+# Interval full reload gallery (detik), safety net kalau listener RTDB terputus
+GALLERY_REFRESH_INTERVAL = int(os.environ.get('GALLERY_REFRESH_INTERVAL', 300))
+
+# Mode index gallery: 'flat' (exact scan) atau 'ivf' (approximate nearest neighbour)
+GALLERY_INDEX = os.environ.get('GALLERY_INDEX', 'flat')
+ANN_NLIST = int(os.environ.get('ANN_NLIST', 0)) or None
+ANN_NPROBE = int(os.environ.get('ANN_NPROBE', 8))
+ANN_MIN_SIZE = int(os.environ.get('ANN_MIN_SIZE', 1000))
+ANN_INDEX_PATH = os.environ.get('ANN_INDEX_PATH', 'gallery_ivf.npz')
+
+# Spool file lokal untuk access logs yang belum terkirim ke Firebase
+LOG_SPOOL_PATH = os.environ.get('LOG_SPOOL_PATH', 'access_logs_spool.jsonl')
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+LOG_BATCH_SIZE = int(os.environ.get('LOG_BATCH_SIZE', 100))
+
+# Batas limit /api/logs, dan jumlah log terbaru yang di-scan kalau tanpa storage lokal
+LOG_QUERY_MAX_LIMIT = int(os.environ.get('LOG_QUERY_MAX_LIMIT', 500))
+LOG_QUERY_SCAN_LIMIT = int(os.environ.get('LOG_QUERY_SCAN_LIMIT', 5000))
+
+# Retention access logs: log lebih lama dari N hari dipindah ke arsip gzip per hari
+# di LOG_ARCHIVE_DIR (cek setiap LOG_ARCHIVE_INTERVAL detik). LOG_RETENTION_DAYS=0 mematikan retention
+LOG_RETENTION_DAYS = int(os.environ.get('LOG_RETENTION_DAYS', 30))
+LOG_ARCHIVE_DIR = os.environ.get('LOG_ARCHIVE_DIR', 'log_archive')
+LOG_ARCHIVE_INTERVAL = float(os.environ.get('LOG_ARCHIVE_INTERVAL', 3600))
+
+# Micro-batching untuk /api/recognize: window (ms) dan ukuran batch maksimum
+# RECOGNITION_BATCH_WINDOW_MS=0 mematikan batching
+RECOGNITION_BATCH_WINDOW_MS = float(os.environ.get('RECOGNITION_BATCH_WINDOW_MS', 10))
+RECOGNITION_MAX_BATCH = int(os.environ.get('RECOGNITION_MAX_BATCH', 8))
+
+# Duplicate-frame suppression per kamera: TTL (detik) dan hamming distance dHash maksimum
+# FRAME_CACHE_TTL=0 mematikan cache
+FRAME_CACHE_TTL = float(os.environ.get('FRAME_CACHE_TTL', 10))
+FRAME_CACHE_MAX_DISTANCE = int(os.environ.get('FRAME_CACHE_MAX_DISTANCE', 4))
+
+# Pre-filter murah sebelum HOG detection (frame recognition saja). FRAME_GATE=0 mematikan semua gate,
+# threshold 0 mematikan satu gate. Motion: rata-rata selisih grayscale vs frame sebelumnya tanpa wajah;
+# brightness/contrast: mean/std grayscale 0-255; sharpness: variance Laplacian; detector: '' atau 'haar'
+FRAME_GATE = os.environ.get('FRAME_GATE', '1') == '1'
+FRAME_GATE_MOTION = float(os.environ.get('FRAME_GATE_MOTION', 2.0))
+FRAME_GATE_MIN_BRIGHTNESS = float(os.environ.get('FRAME_GATE_MIN_BRIGHTNESS', 30))
+FRAME_GATE_MAX_BRIGHTNESS = float(os.environ.get('FRAME_GATE_MAX_BRIGHTNESS', 230))
+FRAME_GATE_MIN_CONTRAST = float(os.environ.get('FRAME_GATE_MIN_CONTRAST', 10))
+FRAME_GATE_MIN_SHARPNESS = float(os.environ.get('FRAME_GATE_MIN_SHARPNESS', 20))
+FRAME_GATE_DETECTOR = os.environ.get('FRAME_GATE_DETECTOR', '') or None
+
+# Admission control /api/recognize: request yang diproses bersamaan, panjang queue,
+# dan batas waktu tunggu di queue (ms). RECOGNITION_MAX_ACTIVE=0 mematikan admission control
+RECOGNITION_MAX_ACTIVE = int(os.environ.get('RECOGNITION_MAX_ACTIVE', 8))
+RECOGNITION_MAX_WAITING = int(os.environ.get('RECOGNITION_MAX_WAITING', 16))
+RECOGNITION_QUEUE_TIMEOUT_MS = float(os.environ.get('RECOGNITION_QUEUE_TIMEOUT_MS', 2000))
+
+# MJPEG stream yang dibaca langsung oleh server, format "nama=url,nama=url" (atau url saja)
+STREAM_URLS = os.environ.get('STREAM_URLS', '')
+# Proses setiap N frame, atau frame dengan motion (rata-rata selisih grayscale > threshold)
+STREAM_EVERY_N = int(os.environ.get('STREAM_EVERY_N', 5))
+if STREAM_EVERY_N < 1:
+    raise ValueError(f"STREAM_EVERY_N must be at least 1, got {STREAM_EVERY_N}")
+STREAM_MOTION_THRESHOLD = float(os.environ.get('STREAM_MOTION_THRESHOLD', 6.0))
+# ESP8266 untuk unlock dari stream mode (di mode POST, ESP32-CAM yang mengirim unlock).
+# Kosong = hasil stream hanya bisa dibaca lewat /api/streams
+ACTUATOR_URL = os.environ.get('ACTUATOR_URL', '')
+ACTUATOR_DEDUPE_SECONDS = float(os.environ.get('ACTUATOR_DEDUPE_SECONDS', 3.0))
+
+# Tambahkan header Server-Timing (durasi per stage) di setiap response
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '0') == '1'
+
+# Content-Type yang diperlakukan sebagai raw image body
+RAW_IMAGE_TYPES = ('image/jpeg', 'image/png', 'application/octet-stream')
+
 # Temporary directory untuk menyimpan images
 TEMP_DIR = tempfile.mkdtemp()
 
+def create_ann_index():
+    """Load ANN index dari disk kalau ada, kalau tidak buat index baru"""
+    if GALLERY_INDEX != 'ivf':
+        return None
+    if os.path.exists(ANN_INDEX_PATH):
+        try:
+            index = IVFIndex.load(ANN_INDEX_PATH)
+            index.nprobe = ANN_NPROBE
+            return index
+        except Exception as e:
+            print(f"Error loading ANN index, rebuilding: {e}")
+    return IVFIndex(nlist=ANN_NLIST, nprobe=ANN_NPROBE)
+
+# Cache face encodings, di-sync lewat listener RTDB
+face_gallery = FaceGallery(
+    users_ref,
+    refresh_interval=GALLERY_REFRESH_INTERVAL,
+    index=create_ann_index(),
+    index_path=ANN_INDEX_PATH,
+    ann_min_size=ANN_MIN_SIZE
+)
+face_gallery.start()
+
+# Index PIN in-memory (salted hash), verifikasi tanpa round trip ke Firebase
+pin_index = PinIndex(pins_ref, refresh_interval=GALLERY_REFRESH_INTERVAL)
+pin_index.start()
+
+# Access logs ditulis di background, tidak menahan keputusan unlock
+log_writer = AccessLogWriter(
+    logs_ref,
+    spool_path=LOG_SPOOL_PATH,
+    max_queue=LOG_QUEUE_SIZE,
+    batch_size=LOG_BATCH_SIZE
+)
+log_writer.start()
+
+# Arsip log lama (partisi gzip JSONL per hari), storage utama hanya menyimpan log terbaru
+log_archive = LogArchive(LOG_ARCHIVE_DIR)
+
+# Agregat access log (minute/hour/day) untuk /api/stats, di-update setiap log ditulis
+access_stats = AccessStats()
+
+def load_all_logs():
+    """
+    Semua access log (log_id, log_data): arsip, storage utama dan spool.
+    Queue write-behind di-flush dulu supaya log yang baru di-record ikut terbaca.
+    """
+    log_writer.flush()
+    return chain(log_archive.iter_logs(), (logs_ref.get() or {}).items(), log_writer.spooled())
+
+def rebuild_access_stats():
+    """Hitung ulang agregat dari arsip + log di storage utama, return jumlah log"""
+    return access_stats.rebuild(load_all_logs)
+
+def fetch_expired_logs(cutoff, limit):
+    """Ambil log dengan timestamp sebelum cutoff (tanggal ISO) dari storage utama"""
+    if local_store is not None:
+        logs, _ = local_store.query_logs(limit, until=cutoff)
+        return logs
+    logs = logs_ref.order_by_child('timestamp').end_at(cutoff).limit_to_first(limit).get() or {}
+    return list(logs.items())
+
+log_retention = None
+if LOG_RETENTION_DAYS > 0:
+    log_retention = LogRetention(
+        logs_ref,
+        log_archive,
+        fetch_expired_logs,
+        retention_days=LOG_RETENTION_DAYS,
+        interval=LOG_ARCHIVE_INTERVAL
+    )
+    log_retention.start()
+
+# Cache keputusan untuk frame yang tidak berubah dari kamera yang sama
+frame_cache = FrameCache(FRAME_CACHE_TTL, FRAME_CACHE_MAX_DISTANCE) if FRAME_CACHE_TTL > 0 else None
+
+# Cascade gate murah (motion, exposure, blur, detector opsional) sebelum HOG detection
+frame_gate = None
+if FRAME_GATE:
+    frame_gate = FrameGate(
+        motion_threshold=FRAME_GATE_MOTION,
+        min_brightness=FRAME_GATE_MIN_BRIGHTNESS,
+        max_brightness=FRAME_GATE_MAX_BRIGHTNESS,
+        min_contrast=FRAME_GATE_MIN_CONTRAST,
+        min_sharpness=FRAME_GATE_MIN_SHARPNESS,
+        detector=FRAME_GATE_DETECTOR
+    )
+
+# Scheduler yang menggabungkan recognition request yang datang bersamaan
+recognition_batcher = None
+if RECOGNITION_BATCH_WINDOW_MS > 0:
+    recognition_batcher = MicroBatcher(
+        lambda images: recognize_images(images),
+        window=RECOGNITION_BATCH_WINDOW_MS / 1000,
+        max_batch=RECOGNITION_MAX_BATCH
+    )
+    recognition_batcher.start()
+
+# Bounded admission di depan recognition pipeline (latest frame wins per kamera)
+recognition_admission = None
+if RECOGNITION_MAX_ACTIVE > 0:
+    recognition_admission = AdmissionController(
+        max_active=RECOGNITION_MAX_ACTIVE,
+        max_waiting=RECOGNITION_MAX_WAITING,
+        timeout=RECOGNITION_QUEUE_TIMEOUT_MS / 1000
+    )
+
+# Metrics untuk /api/metrics (Prometheus text format)
+face_engine.stage_observer = metrics.observe_stage
+http_duration = metrics.registry.histogram(
+    'face_server_http_request_duration_seconds', 'Latency request per endpoint'
+)
+recognition_outcomes = metrics.registry.counter(
+    'face_server_recognition_outcomes_total', 'Hasil recognition (match, no_match, no_face, ...)'
+)
+admission_rejections = metrics.registry.counter(
+    'face_server_admission_rejected_total', 'Recognition request yang ditolak admission control'
+)
+frame_gate_rejections = metrics.registry.counter(
+    'face_server_frame_gate_rejected_total', 'Frame yang ditolak pre-filter sebelum face detection'
+)
+metrics.registry.gauge('face_server_admission_active', 'Recognition request yang sedang diproses',
+                       lambda: recognition_admission.stats()['active'] if recognition_admission else None)
+metrics.registry.gauge('face_server_admission_waiting', 'Recognition request yang menunggu di queue',
+                       lambda: recognition_admission.stats()['waiting'] if recognition_admission else None)
+metrics.registry.gauge('face_server_ready', 'Model sudah di-warm-up dan server siap (1/0)',
+                       lambda: int(startup.ready))
+metrics.registry.gauge('face_server_gallery_size', 'Jumlah active user di gallery', lambda: len(face_gallery))
+metrics.registry.gauge('face_server_log_queue_depth', 'Access log yang menunggu di-flush',
+                       lambda: log_writer.stats()['queue_depth'])
+metrics.registry.gauge('face_server_log_spool_depth', 'Access log di spool file lokal',
+                       lambda: log_writer.stats()['spool_depth'])
+metrics.registry.gauge('face_server_sync_outbox_depth', 'Perubahan lokal yang belum tersinkron ke Firebase',
+                       lambda: local_store.outbox_depth() if replicator else None)
+metrics.registry.gauge('face_server_frame_cache_hits', 'Frame cache hits',
+                       lambda: frame_cache.stats()['hits'] if frame_cache else None)
+metrics.registry.gauge('face_server_frame_cache_misses', 'Frame cache misses',
+                       lambda: frame_cache.stats()['misses'] if frame_cache else None)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    metrics.start_request_timings()
+
+@app.after_request
+def record_request_metrics(response):
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_duration.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+        if SERVER_TIMING:
+            timings = metrics.request_timings() + [('total', elapsed)]
+            response.headers['Server-Timing'] = metrics.server_timing_header(timings)
+    return response
+
 def decode_image(base64_string):
     """Decode base64 image dari ESP32-CAM"""
     try:
         img_data = base64.b64decode(base64_string)
-        nparr = np.frombuffer(img_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        return img
+        return decode_image_bytes(img_data)
     except Exception as e:
         print(f"Error decoding image: {e}")
         return None
 
-def get_face_encoding(image):
-    """Extract face encoding menggunakan face_recognition"""
+def decode_image_bytes(buffer):
+    """Decode JPEG/PNG langsung dari buffer (bytes/bytearray/memoryview) tanpa copy"""
     try:
-        # Convert BGR to RGB (OpenCV uses BGR, face_recognition uses RGB)
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        
-        # Find face locations
-        face_locations = face_recognition.face_locations(rgb_image, model="hog")
-        
-        if not face_locations:
-            return None, "No face detected"
-        
-        if len(face_locations) > 1:
-            return None, "Multiple faces detected. Please ensure only one face is visible"
-        
-        # Get face encoding
-        face_encodings = face_recognition.face_encodings(rgb_image, face_locations)
-        
-        if not face_encodings:
-            return None, "Could not encode face"
-        
-        return face_encodings[0].tolist(), None
-        
+        nparr = np.frombuffer(buffer, np.uint8)
+        if nparr.size == 0:
+            return None
+        return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
     except Exception as e:
-        return None, f"Error extracting face: {str(e)}"
+        print(f"Error decoding image: {e}")
+        return None
+
+def read_request_body():
+    """Baca raw body langsung ke satu buffer yang sudah dialokasikan sesuai Content-Length"""
+    length = request.content_length
+    if not length:
+        return request.get_data(cache=False)
+    
+    buffer = bytearray(length)
+    view = memoryview(buffer)
+    received = 0
+    while received < length:
+        n = request.stream.readinto(view[received:])
+        if not n:
+            break
+        received += n
+    return view[:received]
 
-def load_known_faces():
-    """Load semua face encodings dari Firebase"""
-    users = users_ref.get()
-    known_faces = {}
+def parse_image_request(image_fields):
+    """
+    Ambil form fields dan decoded images dari request. Format yang didukung:
+      - image/jpeg (raw body): satu image, field lain dari query string
+      - multipart/form-data: image sebagai file part, field lain sebagai form field
+      - application/json: image sebagai base64 string (format lama)
+    Return (data, images). images hanya berisi field yang dikirim, dengan
+    value None kalau image tidak bisa di-decode.
+    """
+    images = {}
     
-    if users:
-        for user_id, user_data in users.items():
-            if 'face_encoding' in user_data and user_data.get('status') == 'active':
-                encoding = user_data['face_encoding']
-                known_faces[user_id] = {
-                    'encoding': np.array(encoding),
-                    'name': user_data.get('name', 'Unknown'),
-                    'email': user_data.get('email', ''),
-                    'phone': user_data.get('phone', '')
-                }
+    if request.mimetype in RAW_IMAGE_TYPES:
+        data = request.args.to_dict()
+        with stage_timer('read_body'):
+            body = read_request_body()
+        with stage_timer('decode'):
+            images[image_fields[0]] = decode_image_bytes(body)
+    elif request.mimetype == 'multipart/form-data':
+        data = request.form.to_dict()
+        for field in image_fields:
+            if field in request.files:
+                stream = request.files[field].stream
+                buffer = stream.getbuffer() if hasattr(stream, 'getbuffer') else stream.read()
+                with stage_timer('decode'):
+                    images[field] = decode_image_bytes(buffer)
+    else:
+        with stage_timer('parse_json'):
+            data = request.get_json(silent=True) or {}
+        for field in image_fields:
+            if field in data:
+                with stage_timer('decode'):
+                    images[field] = decode_image(data[field])
     
-    return known_faces
+    return data, images
+
+def encode_face(image):
+    """Extract face encoding, lewat inference pool kalau aktif"""
+    if inference_pool is not None:
+        return inference_pool.encode(image)
+    return get_face_encoding(image)
+
+def encode_faces(images):
+    """Encode beberapa image sekaligus (paralel kalau inference pool aktif, selain itu batch dlib)"""
+    if inference_pool is not None:
+        return inference_pool.encode_many(images)
+    return get_face_encodings_batch(images)
+
+def recognize_images(images):
+    """
+    Encode semua image dalam satu batch, lalu match ke gallery dengan satu
+    matrix product. Return list (encoding, error, match_result).
+    """
+    if inference_pool is not None:
+        encoded = inference_pool.encode_many(images)
+    else:
+        encoded = get_face_encodings_batch(images)
+    
+    valid = [i for i, (encoding, _) in enumerate(encoded) if encoding is not None]
+    matches = face_gallery.match_many([encoded[i][0] for i in valid], TOLERANCE) if valid else []
+    
+    results = [(encoding, error, None) for encoding, error in encoded]
+    for i, result in zip(valid, matches):
+        results[i] = (encoded[i][0], None, result)
+    return results
+
+def recognize_image(image):
+    """Recognize satu image, digabung dengan request lain kalau batching aktif"""
+    if recognition_batcher is not None:
+        return recognition_batcher.submit(image)
+    return recognize_images([image])[0]
+
+def camera_source():
+    """Identitas kamera pengirim frame: header X-Camera-Id, fallback ke IP client"""
+    return request.headers.get('X-Camera-Id') or request.remote_addr or 'unknown'
+
+def run_recognition(image, source, log_errors=True):
+    """
+    Pipeline recognition lengkap untuk satu frame (cache, gate, encode + match, log).
+    Frame yang hampir identik dengan frame sebelumnya dari kamera yang sama
+    langsung dijawab dari frame cache (kecuali keputusan authorized, yang
+    selalu di-match dan di-log ulang). Frame yang diam, gelap atau blur
+    ditolak frame gate sebelum HOG detection (hasilnya ikut di-cache, jadi
+    frame idle yang berulang hanya menulis satu access log). Return response body (dict).
+    log_errors=False tidak menulis access log untuk frame tanpa wajah yang valid.
+    """
+    fingerprint = None
+    if frame_cache is not None:
+        with stage_timer('frame_hash'):
+            fingerprint = difference_hash(image)
+        cached = frame_cache.lookup(source, fingerprint, face_gallery.version)
+        if cached is not None:
+            recognition_outcomes.inc(outcome='cached')
+            return {**cached, 'cached': True}
+    
+    generation = face_gallery.version
+    started = time.perf_counter()
+    body = None
+    if frame_gate is not None:
+        with stage_timer('frame_gate'):
+            rejection = frame_gate.check(source, image)
+        if rejection is not None:
+            # Message tetap "No face detected" (firmware memakainya untuk membedakan
+            # frame kosong dari wajah tidak dikenal), alasan detail di field gate
+            frame_gate_rejections.inc(gate=rejection.gate, reason=rejection.reason)
+            body = {**recognition_failed("No face detected", log_errors, 'gated'), 'gate': rejection.to_dict()}
+    
+    if body is None:
+        body = recognize_and_log(image, log_errors)
+        if frame_gate is not None:
+            frame_gate.record_result(source, face_found=body['message'] != 'No face detected')
+    
+    if frame_cache is not None:
+        frame_cache.store(source, fingerprint, body, generation, time.perf_counter() - started)
+    return body
+
+def recognition_error_outcome(error):
+    """Label metrics untuk error dari get_face_encoding"""
+    if error == "No face detected":
+        return 'no_face'
+    if error.startswith("Multiple faces"):
+        return 'multiple_faces'
+    if error == "Could not encode face":
+        return 'encode_failed'
+    return 'error'
+
+def write_access_log(log_data):
+    """Tulis access log (write-behind) dan update agregat statistik"""
+    log_id = log_writer.write(log_data)
+    access_stats.record(log_data, log_id)
+
+def recognition_failed(error, log_errors, outcome):
+    """Response (dan access log) untuk frame yang tidak bisa di-recognize"""
+    recognition_outcomes.inc(outcome=outcome)
+    # Log failed attempt
+    if log_errors:
+        log_data = {
+            'timestamp': datetime.now().isoformat(),
+            'authorized': False,
+            'user_id': 'unknown',
+            'user_name': 'Unknown',
+            'confidence': 0,
+            'reason': error
+        }
+        write_access_log(log_data)
+    
+    return {
+        'success': False,
+        'authorized': False,
+        'message': error
+    }
+
+def recognize_and_log(image, log_errors=True):
+    """Encode + match satu frame dan tulis access log"""
+    # Encode + match lewat micro-batching scheduler
+    with stage_timer('recognition'):
+        face_encoding, error, result = recognize_image(image)
+    if error:
+        return recognition_failed(error, log_errors, recognition_error_outcome(error))
+    
+    if result is None:
+        recognition_outcomes.inc(outcome='no_users')
+        return {
+            'success': False,
+            'authorized': False,
+            'message': 'No registered users in database'
+        }
+    
+    best_match = None
+    if result['best']:
+        distance = result['best']['distance']
+        best_match = {
+            'user_id': result['best']['user_id'],
+            'name': result['best']['name'],
+            'email': result['best']['email'],
+            'phone': result['best']['phone'],
+            'confidence': round((1 - distance) * 100, 2),
+            'distance': round(distance, 4),
+            'margin': round(result['margin'], 4) if result['margin'] is not None else None
+        }
+    
+    # Log access attempt
+    log_data = {
+        'timestamp': datetime.now().isoformat(),
+        'authorized': best_match is not None,
+        'user_id': best_match['user_id'] if best_match else 'unknown',
+        'user_name': best_match['name'] if best_match else 'Unknown',
+        'confidence': best_match['confidence'] if best_match else 0
+    }
+    write_access_log(log_data)
+    recognition_outcomes.inc(outcome='match' if best_match else 'no_match')
+    
+    if best_match:
+        return {
+            'success': True,
+            'authorized': True,
+            'user': best_match,
+            'message': f'Welcome {best_match["name"]}!'
+        }
+    else:
+        return {
+            'success': True,
+            'authorized': False,
+            'message': 'Face not recognized or confidence too low'
+        }
+
+# Perintah unlock dari stream mode dikirim ke ESP8266 di background
+actuator = None
+if ACTUATOR_URL:
+    actuator = ActuatorDispatcher(ACTUATOR_URL, dedupe_window=ACTUATOR_DEDUPE_SECONDS)
+    actuator.start()
+
+def process_stream_frame(source, image):
+    """
+    Frame dari MJPEG stream masuk ke pipeline yang sama dengan /api/recognize
+    (access log ditulis di recognize_and_log). Wajah yang authorized langsung
+    dikirim sebagai unlock ke ESP8266, sama seperti firmware ESP32-CAM.
+    """
+    if recognition_admission is None:
+        body = run_recognition(image, source, log_errors=False)
+    else:
+        try:
+            with recognition_admission.admit(source) as waited:
+                metrics.observe_stage('queue_wait', waited)
+                body = run_recognition(image, source, log_errors=False)
+        except AdmissionRejected as e:
+            admission_rejections.inc(reason=e.reason)
+            return None
+
+    if body.get('authorized') and actuator is not None:
+        user = body['user']
+        actuator.dispatch('unlock', {
+            'method': 'face',
+            'name': user['name'],
+            'confidence': user['confidence'] / 100.0
+        })
+    return body
+
+def parse_stream_urls(value):
+    """'front=http://a/stream,http://b/stream' -> [('front', url), ('http://b/stream', url)]"""
+    streams = []
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, sep, url = item.partition('=')
+        streams.append((name, url) if sep and not name.startswith('http') else (item, item))
+    return streams
+
+# Stream consumer per kamera (server-side ingestion, tanpa POST dari ESP32-CAM)
+stream_consumers = [
+    StreamConsumer(source, url, process_stream_frame,
+                   every_n=STREAM_EVERY_N, motion_threshold=STREAM_MOTION_THRESHOLD)
+    for source, url in parse_stream_urls(STREAM_URLS)
+]
+
+def start_stream_consumers():
+    for consumer in stream_consumers:
+        consumer.start()
 
 @app.route('/api/register', methods=['POST'])
 def register_face():
@@ -99,18 +642,20 @@ def register_face():
         "email": "email@example.com",
         "phone": "08123456789" (optional)
     }
+    atau multipart/form-data (file "image" + form fields), atau raw
+    image/jpeg body dengan ?name=...&email=... di query string
     """
     try:
-        data = request.json
+        data, images = parse_image_request(['image'])
         
-        if not data or 'image' not in data or 'name' not in data:
+        if 'image' not in images or 'name' not in data:
             return jsonify({
                 'success': False,
                 'message': 'Missing required fields: image and name'
             }), 400
         
         # Decode image
-        image = decode_image(data['image'])
+        image = images['image']
         if image is None:
             return jsonify({
                 'success': False,
@@ -118,7 +663,7 @@ def register_face():
             }), 400
         
         # Get face encoding
-        face_encoding, error = get_face_encoding(image)
+        face_encoding, error = encode_face(image)
         if error:
             return jsonify({
                 'success': False,
@@ -126,20 +671,13 @@ def register_face():
             }), 400
         
         # Check if face already registered
-        known_faces = load_known_faces()
-        for user_id, user_info in known_faces.items():
-            matches = face_recognition.compare_faces(
-                [user_info['encoding']], 
-                np.array(face_encoding),
-                tolerance=TOLERANCE
-            )
-            
-            if matches[0]:
-                distance = face_recognition.face_distance([user_info['encoding']], np.array(face_encoding))[0]
-                return jsonify({
-                    'success': False,
-                    'message': f'Face already registered as {user_info["name"]} (distance: {round(distance, 4)})'
-                }), 400
+        result = face_gallery.match(face_encoding, tolerance=TOLERANCE, k=1)
+        if result and result['best']:
+            existing = result['best']
+            return jsonify({
+                'success': False,
+                'message': f'Face already registered as {existing["name"]} (distance: {round(existing["distance"], 4)})'
+            }), 400
         
         # Generate user ID
         user_id = data.get('user_id', f"user_{datetime.now().strftime('%Y%m%d%H%M%S')}")
@@ -149,13 +687,14 @@ def register_face():
             'name': data['name'],
             'email': data.get('email', ''),
             'phone': data.get('phone', ''),
-            'face_encoding': face_encoding,
+            'face_encoding': pack_encoding(face_encoding, ENCODING_FORMAT),
             'registered_at': datetime.now().isoformat(),
             'status': 'active',
             'model': 'face_recognition'
         }
         
         users_ref.child(user_id).set(user_data)
+        face_gallery.upsert(user_id, user_data)
         
         return jsonify({
             'success': True,
@@ -169,114 +708,249 @@ def register_face():
             'message': f'Server error: {str(e)}'
         }), 500
 
-@app.route('/api/recognize', methods=['POST'])
-def recognize_face():
+@app.route('/api/register/bulk', methods=['POST'])
+def register_bulk():
     """
-    Recognize wajah dari ESP32-CAM
+    Register banyak user sekaligus, masing-masing dengan beberapa foto
     Body: {
-        "image": "base64_encoded_image"
+        "users": [
+            {"name": "John Doe", "email": "...", "phone": "...", "images": ["base64", ...]},
+            ...
+        ],
+        "templates": "mean" | "multi"
     }
+    "mean" (default) menyimpan rata-rata encoding semua foto; "multi" juga
+    menyimpan encoding setiap foto sebagai template tambahan.
+    user_id opsional per user; yang sudah terdaftar ditolak dengan 409, yang
+    dobel dalam satu request dengan 400. Tanpa user_id dibuat key unik.
+    Response berisi hasil per user dengan urutan yang sama seperti request.
     """
     try:
-        data = request.json
+        data = request.get_json(silent=True) or {}
+        users = data.get('users')
+        mode = data.get('templates', 'mean')
         
-        if not data or 'image' not in data:
+        if not isinstance(users, list) or not users:
             return jsonify({
                 'success': False,
-                'authorized': False,
-                'message': 'No image provided'
+                'message': 'Missing required field: users'
             }), 400
-        
-        # Decode image
-        image = decode_image(data['image'])
-        if image is None:
+        if mode not in ('mean', 'multi'):
             return jsonify({
                 'success': False,
-                'authorized': False,
-                'message': 'Invalid image format'
+                'message': 'templates must be "mean" or "multi"'
             }), 400
         
-        # Get face encoding
-        face_encoding, error = get_face_encoding(image)
-        if error:
-            # Log failed attempt
-            log_data = {
-                'timestamp': datetime.now().isoformat(),
-                'authorized': False,
-                'user_id': 'unknown',
-                'user_name': 'Unknown',
-                'confidence': 0,
-                'reason': error
-            }
-            logs_ref.push(log_data)
-            
-            return jsonify({
-                'success': False,
-                'authorized': False,
-                'message': error
-            }), 200
-        
-        # Load known faces
-        known_faces = load_known_faces()
+        requested_ids = set()
+        for i, user in enumerate(users):
+            if not isinstance(user, dict):
+                continue
+            images = user.get('images')
+            if images is not None and not (isinstance(images, list) and all(isinstance(image, str) for image in images)):
+                return jsonify({
+                    'success': False,
+                    'message': f'users[{i}].images must be a list of base64 strings'
+                }), 400
+            user_id = user.get('user_id')
+            if user_id is None:
+                continue
+            if not isinstance(user_id, str) or not user_id or any(c in user_id for c in '.#$[]/'):
+                return jsonify({
+                    'success': False,
+                    'message': f'users[{i}].user_id must be a non-empty string without . # $ [ ] /'
+                }), 400
+            if user_id in requested_ids:
+                return jsonify({
+                    'success': False,
+                    'message': f'Duplicate user_id in request: {user_id}'
+                }), 400
+            requested_ids.add(user_id)
+            if face_gallery.user(user_id) is not None:
+                return jsonify({
+                    'success': False,
+                    'message': f'User {user_id} already exists'
+                }), 409
         
-        if not known_faces:
+        total_images = sum(len(user.get('images') or []) for user in users if isinstance(user, dict))
+        if total_images > BULK_MAX_IMAGES:
             return jsonify({
                 'success': False,
-                'authorized': False,
-                'message': 'No registered users in database'
-            }), 200
+                'message': f'Too many images ({total_images}), maximum is {BULK_MAX_IMAGES}'
+            }), 400
         
-        # Compare with known faces
-        best_match = None
-        best_distance = float('inf')
+        results = [{'index': i, 'success': False} for i in range(len(users))]
+        
+        # Decode semua foto, lalu encode dalam satu batch (paralel lewat inference pool)
+        images, owners = [], []
+        for i, user in enumerate(users):
+            if not isinstance(user, dict) or not user.get('name') or not user.get('images'):
+                results[i]['message'] = 'Missing required fields: name and images'
+                continue
+            results[i]['name'] = user['name']
+            for image_data in user['images']:
+                with stage_timer('decode'):
+                    image = decode_image(image_data)
+                if image is not None:
+                    images.append(image)
+                    owners.append(i)
+        
+        encoded = encode_faces(images) if images else []
+        samples = {}
+        rejected = {}
+        for owner, (encoding, error) in zip(owners, encoded):
+            if error:
+                rejected[owner] = rejected.get(owner, 0) + 1
+            else:
+                samples.setdefault(owner, []).append(encoding)
+        
+        # Satu template per user: rata-rata semua sample yang valid
+        candidates = []
+        for i, user in enumerate(users):
+            if 'message' in results[i]:
+                continue
+            results[i]['samples'] = len(samples.get(i, []))
+            results[i]['rejected_samples'] = len(user['images']) - results[i]['samples']
+            if i not in samples:
+                results[i]['message'] = 'No usable face found in any image'
+                continue
+            encodings = np.asarray(samples[i], dtype=np.float32)
+            mean = encodings.mean(axis=0)
+            spread = np.linalg.norm(encodings - mean, axis=1).max()
+            if spread > TOLERANCE:
+                results[i]['message'] = 'Images do not appear to show the same person'
+                continue
+            candidates.append((i, mean, encodings))
+        
+        # Duplicate check vectorized: ke gallery (satu match_many) dan antar user di batch ini
+        if candidates:
+            means = np.stack([mean for _, mean, _ in candidates])
+            gallery_matches = face_gallery.match_many(means, TOLERANCE, k=1)
+            sq = (means * means).sum(axis=1)
+            within = np.sqrt(np.maximum(sq[:, None] + sq[None, :] - 2.0 * means @ means.T, 0.0))
+            
+            accepted = []
+            for position, (i, mean, encodings) in enumerate(candidates):
+                match = gallery_matches[position]
+                if match and match['best']:
+                    existing = match['best']
+                    results[i]['message'] = f'Face already registered as {existing["name"]} (distance: {round(existing["distance"], 4)})'
+                    continue
+                earlier = [p for p in accepted if within[position, p] <= TOLERANCE]
+                if earlier:
+                    results[i]['message'] = f'Same face as {users[candidates[earlier[0]][0]]["name"]} in this batch'
+                    continue
+                accepted.append(position)
+        else:
+            accepted = []
+        
+        # Commit semua user sebagai satu multi-path write
+        timestamp = datetime.now()
+        records = {}
+        for position in accepted:
+            i, mean, encodings = candidates[position]
+            user = users[i]
+            # Push key (urut waktu, unik) supaya dua request di detik yang sama tidak bentrok
+            user_id = user.get('user_id') or f"user_{generate_push_id()}"
+            record = {
+                'name': user['name'],
+                'email': user.get('email', ''),
+                'phone': user.get('phone', ''),
+                'face_encoding': pack_encoding(mean, ENCODING_FORMAT),
+                'registered_at': timestamp.isoformat(),
+                'status': 'active',
+                'model': 'face_recognition'
+            }
+            if mode == 'multi':
+                record['face_templates'] = [pack_encoding(e, ENCODING_FORMAT) for e in encodings]
+            records[user_id] = record
+            results[i].update({'success': True, 'user_id': user_id})
         
-        face_encoding_array = np.array(face_encoding)
+        if records:
+            users_ref.update(records)
+            for user_id, record in records.items():
+                face_gallery.upsert(user_id, record)
         
-        for user_id, user_info in known_faces.items():
-            matches = face_recognition.compare_faces(
-                [user_info['encoding']], 
-                face_encoding_array,
-                tolerance=TOLERANCE
-            )
-            
-            if matches[0]:
-                distance = face_recognition.face_distance([user_info['encoding']], face_encoding_array)[0]
-                
-                if distance < best_distance:
-                    best_distance = distance
-                    confidence = round((1 - distance) * 100, 2)
-                    best_match = {
-                        'user_id': user_id,
-                        'name': user_info['name'],
-                        'email': user_info['email'],
-                        'phone': user_info['phone'],
-                        'confidence': confidence,
-                        'distance': round(float(distance), 4)
-                    }
+        return jsonify({
+            'success': bool(records),
+            'message': f'{len(records)} of {len(users)} users registered',
+            'registered': len(records),
+            'failed': len(users) - len(records),
+            'results': results
+        }), 201 if records else 400
         
-        # Log access attempt
-        log_data = {
-            'timestamp': datetime.now().isoformat(),
-            'authorized': best_match is not None,
-            'user_id': best_match['user_id'] if best_match else 'unknown',
-            'user_name': best_match['name'] if best_match else 'Unknown',
-            'confidence': best_match['confidence'] if best_match else 0
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Server error: {str(e)}'
+        }), 500
+
+@app.route('/api/recognize', methods=['POST'])
+def recognize_face():
+    """
+    Recognize wajah dari ESP32-CAM
+    Body: {
+        "image": "base64_encoded_image"
+    }
+    atau raw image/jpeg body, atau multipart/form-data dengan file "image"
+
+    Kalau server overload atau model belum selesai warm-up, request ditolak
+    cepat dengan 503 + Retry-After.
+    """
+    if not startup.ready:
+        response = jsonify({
+            'success': False,
+            'authorized': False,
+            'message': 'Server is warming up, try again later'
+        })
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    
+    source = camera_source()
+    if recognition_admission is None:
+        return recognize_frame(source)
+
+    try:
+        with recognition_admission.admit(source) as waited:
+            metrics.observe_stage('queue_wait', waited)
+            return recognize_frame(source)
+    except AdmissionRejected as e:
+        admission_rejections.inc(reason=e.reason)
+        messages = {
+            'overloaded': 'Server busy, try again later',
+            'deadline': 'Server busy, request timed out in queue',
+            'superseded': 'Superseded by a newer frame from the same camera'
         }
-        logs_ref.push(log_data)
+        response = jsonify({
+            'success': False,
+            'authorized': False,
+            'message': messages[e.reason]
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+
+def recognize_frame(source):
+    """Decode frame dari request lalu jalankan recognition pipeline"""
+    try:
+        data, images = parse_image_request(['image'])
         
-        if best_match:
+        if 'image' not in images:
             return jsonify({
-                'success': True,
-                'authorized': True,
-                'user': best_match,
-                'message': f'Welcome {best_match["name"]}!'
-            }), 200
-        else:
+                'success': False,
+                'authorized': False,
+                'message': 'No image provided'
+            }), 400
+        
+        # Decode image
+        image = images['image']
+        if image is None:
             return jsonify({
-                'success': True,
+                'success': False,
                 'authorized': False,
-                'message': 'Face not recognized or confidence too low'
-            }), 200
+                'message': 'Invalid image format'
+            }), 400
+        
+        body = run_recognition(image, source)
+        return jsonify(body), 200
         
     except Exception as e:
         return jsonify({
@@ -293,19 +967,20 @@ def verify_faces():
         "image1": "base64_encoded_image",
         "image2": "base64_encoded_image"
     }
+    atau multipart/form-data dengan file "image1" dan "image2"
     """
     try:
-        data = request.json
+        data, images = parse_image_request(['image1', 'image2'])
         
-        if not data or 'image1' not in data or 'image2' not in data:
+        if 'image1' not in images or 'image2' not in images:
             return jsonify({
                 'success': False,
                 'message': 'Missing required fields: image1 and image2'
             }), 400
         
         # Decode images
-        image1 = decode_image(data['image1'])
-        image2 = decode_image(data['image2'])
+        image1 = images['image1']
+        image2 = images['image2']
         
         if image1 is None or image2 is None:
             return jsonify({
@@ -314,8 +989,7 @@ def verify_faces():
             }), 400
         
         # Get face encodings
-        encoding1, error1 = get_face_encoding(image1)
-        encoding2, error2 = get_face_encoding(image2)
+        (encoding1, error1), (encoding2, error2) = encode_faces([image1, image2])
         
         if error1 or error2:
             return jsonify({
@@ -323,17 +997,12 @@ def verify_faces():
                 'message': error1 or error2
             }), 400
         
-        # Compare faces
-        matches = face_recognition.compare_faces(
-            [np.array(encoding1)], 
-            np.array(encoding2),
-            tolerance=TOLERANCE
-        )
-        distance = face_recognition.face_distance([np.array(encoding1)], np.array(encoding2))[0]
+        # Compare faces (euclidean distance, sama seperti face_recognition.compare_faces)
+        distance = np.linalg.norm(np.array(encoding1) - np.array(encoding2))
         
         return jsonify({
             'success': True,
-            'verified': bool(matches[0]),
+            'verified': bool(distance <= TOLERANCE),
             'distance': round(float(distance), 4),
             'threshold': TOLERANCE,
             'model': 'face_recognition',
@@ -348,19 +1017,25 @@ def verify_faces():
 
 @app.route('/api/users', methods=['GET'])
 def get_users():
-    """Get semua registered users"""
+    """
+    Get registered users (metadata saja, dari gallery cache tanpa download encoding)
+    Query: status=active|inactive, limit=N, cursor=<next_cursor dari halaman sebelumnya>
+    Tanpa limit semua user dikembalikan.
+    """
     try:
-        users = users_ref.get()
-        
-        if not users:
+        status = request.args.get('status')
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit', type=int)
+        if limit is not None and limit <= 0:
             return jsonify({
-                'success': True,
-                'users': [],
-                'count': 0
-            }), 200
+                'success': False,
+                'message': 'limit must be a positive integer'
+            }), 400
+        
+        users, next_cursor = face_gallery.users(status=status, cursor=cursor, limit=limit)
         
         users_list = []
-        for user_id, user_data in users.items():
+        for user_id, user_data in users:
             users_list.append({
                 'user_id': user_id,
                 'name': user_data.get('name', ''),
@@ -374,7 +1049,8 @@ def get_users():
         return jsonify({
             'success': True,
             'users': users_list,
-            'count': len(users_list)
+            'count': len(users_list),
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -385,9 +1061,9 @@ def get_users():
 
 @app.route('/api/user/<user_id>', methods=['GET'])
 def get_user(user_id):
-    """Get detail user tertentu"""
+    """Get detail user tertentu (metadata dari gallery cache)"""
     try:
-        user = users_ref.child(user_id).get()
+        user = face_gallery.user(user_id)
         
         if not user:
             return jsonify({
@@ -420,7 +1096,7 @@ def get_user(user_id):
 def update_user(user_id):
     """Update user data (tanpa face encoding)"""
     try:
-        user = users_ref.child(user_id).get()
+        user = face_gallery.user(user_id)
         
         if not user:
             return jsonify({
@@ -447,6 +1123,7 @@ def update_user(user_id):
             }), 400
         
         users_ref.child(user_id).update(update_data)
+        face_gallery.update(user_id, update_data)
         
         return jsonify({
             'success': True,
@@ -463,7 +1140,7 @@ def update_user(user_id):
 def delete_user(user_id):
     """Delete user dari database"""
     try:
-        user = users_ref.child(user_id).get()
+        user = face_gallery.user(user_id)
         
         if not user:
             return jsonify({
@@ -472,6 +1149,7 @@ def delete_user(user_id):
             }), 404
         
         users_ref.child(user_id).delete()
+        face_gallery.remove(user_id)
         
         return jsonify({
             'success': True,
@@ -484,34 +1162,166 @@ def delete_user(user_id):
             'message': f'Server error: {str(e)}'
         }), 500
 
+def query_logs_scan(limit, before=None, after=None, user_id=None, method=None,
+                    authorized=None, since=None, until=None):
+    """
+    Fallback query log untuk STORAGE_BACKEND=firebase (tanpa index lokal):
+    filter dilakukan di LOG_QUERY_SCAN_LIMIT log terbaru. Semantik sama
+    dengan LocalStore.query_logs.
+    """
+    logs = logs_ref.order_by_child('timestamp').limit_to_last(LOG_QUERY_SCAN_LIMIT).get() or {}
+    items = sorted(logs.items(), key=lambda item: (item[1].get('timestamp', ''), item[0]), reverse=True)
+    
+    position = {log_id: (log_data.get('timestamp', ''), log_id) for log_id, log_data in items}
+    for cursor in (before, after):
+        if cursor is not None and cursor not in position:
+            raise KeyError(cursor)
+    
+    def matches(log_id, log_data):
+        key = (log_data.get('timestamp', ''), log_id)
+        return ((before is None or key < position[before])
+                and (after is None or key > position[after])
+                and (user_id is None or log_data.get('user_id') == user_id)
+                and (method is None or log_data.get('method', 'face') == method)
+                and (authorized is None or bool(log_data.get('authorized')) == authorized)
+                and (since is None or key[0] >= since)
+                and (until is None or key[0] <= until))
+    
+    selected = [item for item in items if matches(*item)]
+    if after is not None and before is None:
+        # Ambil yang paling dekat ke cursor after
+        selected = selected[-(limit + 1):]
+        return selected[-limit:], len(selected) > limit
+    return selected[:limit], len(selected) > limit
+
 @app.route('/api/logs', methods=['GET'])
 def get_logs():
-    """Get access logs"""
+    """
+    Get access logs, terbaru dulu
+    Query:
+        limit=50
+        before=<log_id> (halaman lebih lama), after=<log_id> (log yang lebih baru)
+        user_id=..., method=PIN|face, authorized=true|false
+        since=<ISO timestamp>, until=<ISO timestamp>
+    Response berisi next_cursor: pakai sebagai before untuk halaman berikutnya
+    (atau sebagai after lagi kalau query memakai after).
+    """
     try:
         limit = request.args.get('limit', 50, type=int)
-        logs = logs_ref.order_by_child('timestamp').limit_to_last(limit).get()
+        if limit <= 0 or limit > LOG_QUERY_MAX_LIMIT:
+            return jsonify({
+                'success': False,
+                'message': f'limit must be between 1 and {LOG_QUERY_MAX_LIMIT}'
+            }), 400
+        
+        authorized = request.args.get('authorized')
+        filters = {
+            'before': request.args.get('before'),
+            'after': request.args.get('after'),
+            'user_id': request.args.get('user_id'),
+            'method': request.args.get('method'),
+            'authorized': None if authorized is None else authorized.lower() in ('1', 'true', 'yes'),
+            'since': request.args.get('since'),
+            'until': request.args.get('until')
+        }
         
-        if not logs:
+        try:
+            if local_store is not None:
+                logs, has_more = local_store.query_logs(limit, **filters)
+            else:
+                logs, has_more = query_logs_scan(limit, **filters)
+        except KeyError:
             return jsonify({
-                'success': True,
-                'logs': [],
-                'count': 0
-            }), 200
+                'success': False,
+                'message': 'Unknown cursor'
+            }), 400
         
-        logs_list = []
-        for log_id, log_data in logs.items():
-            logs_list.append({
-                'log_id': log_id,
-                **log_data
-            })
+        logs_list = [{'log_id': log_id, **log_data} for log_id, log_data in logs]
+        
+        next_cursor = None
+        if has_more and logs_list:
+            # Paging ke belakang pakai log terlama, paging ke depan (after) pakai log terbaru
+            newer = filters['after'] is not None and filters['before'] is None
+            next_cursor = logs_list[0 if newer else -1]['log_id']
+        
+        return jsonify({
+            'success': True,
+            'logs': logs_list,
+            'count': len(logs_list),
+            'next_cursor': next_cursor
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Server error: {str(e)}'
+        }), 500
+
+@app.route('/api/logs/archive', methods=['GET'])
+def get_archived_logs():
+    """
+    Get access logs dari arsip, terbaru dulu
+    Query:
+        limit=50, before=<log_id> (halaman lebih lama)
+        user_id=..., method=PIN|face, authorized=true|false
+        since=<ISO timestamp>, until=<ISO timestamp> (hanya partisi di range ini yang dibaca)
+    """
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        if limit <= 0 or limit > LOG_QUERY_MAX_LIMIT:
+            return jsonify({
+                'success': False,
+                'message': f'limit must be between 1 and {LOG_QUERY_MAX_LIMIT}'
+            }), 400
         
-        # Sort by timestamp descending
-        logs_list.sort(key=lambda x: x['timestamp'], reverse=True)
+        authorized = request.args.get('authorized')
+        try:
+            logs, has_more = log_archive.query(
+                limit,
+                before=request.args.get('before'),
+                user_id=request.args.get('user_id'),
+                method=request.args.get('method'),
+                authorized=None if authorized is None else authorized.lower() in ('1', 'true', 'yes'),
+                since=request.args.get('since'),
+                until=request.args.get('until')
+            )
+        except KeyError:
+            return jsonify({
+                'success': False,
+                'message': 'Unknown cursor'
+            }), 400
+        
+        logs_list = [{'log_id': log_id, **log_data} for log_id, log_data in logs]
         
         return jsonify({
             'success': True,
             'logs': logs_list,
-            'count': len(logs_list)
+            'count': len(logs_list),
+            'next_cursor': logs_list[-1]['log_id'] if has_more and logs_list else None
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Server error: {str(e)}'
+        }), 500
+
+@app.route('/api/logs/archive', methods=['POST'])
+def archive_logs():
+    """Jalankan retention sekarang: pindahkan log yang sudah lewat retention ke arsip"""
+    try:
+        if log_retention is None:
+            return jsonify({
+                'success': False,
+                'message': 'Log retention is disabled (LOG_RETENTION_DAYS=0)'
+            }), 400
+        
+        moved = log_retention.run_once()
+        
+        return jsonify({
+            'success': True,
+            'message': f'Archived {moved} logs',
+            'archived': moved
         }), 200
         
     except Exception as e:
@@ -522,9 +1332,14 @@ def get_logs():
 
 @app.route('/api/logs/clear', methods=['DELETE'])
 def clear_logs():
-    """Clear all access logs"""
+    """Clear all access logs di storage utama (arsip tidak ikut dihapus)"""
     try:
+        # Log yang masih di queue write-behind ikut terhapus, bukan ditulis setelah delete
+        log_writer.flush()
         logs_ref.delete()
+        # Statistik tinggal dari arsip, dihitung ulang di background (baca semua partisi)
+        access_stats.reset()
+        threading.Thread(target=rebuild_access_stats, daemon=True).start()
         
         return jsonify({
             'success': True,
@@ -537,6 +1352,59 @@ def clear_logs():
             'message': f'Server error: {str(e)}'
         }), 500
 
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """
+    Statistik akses dari agregat yang sudah dihitung (tidak scan raw log).
+    Query: granularity=minute|hour|day (default hour), window=jumlah bucket terakhir
+    """
+    try:
+        granularity = request.args.get('granularity', 'hour')
+        if granularity not in GRANULARITIES:
+            return jsonify({
+                'success': False,
+                'message': f"granularity must be one of: {', '.join(GRANULARITIES)}"
+            }), 400
+
+        try:
+            window = int(request.args.get('window', 24))
+            top = int(request.args.get('top', 5))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'window and top must be integers'
+            }), 400
+        window = max(1, min(window, GRANULARITIES[granularity][1]))
+
+        return jsonify({
+            'success': True,
+            'stats': access_stats.summary(granularity, window, max(0, top))
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Server error: {str(e)}'
+        }), 500
+
+@app.route('/api/stats/rebuild', methods=['POST'])
+def rebuild_stats():
+    """Hitung ulang agregat statistik dari raw access logs"""
+    try:
+        count = rebuild_access_stats()
+
+        return jsonify({
+            'success': True,
+            'message': f'Stats rebuilt from {count} logs',
+            'count': count
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Server error: {str(e)}'
+        }), 500
+
 @app.route('/api/config', methods=['GET'])
 def get_config():
     """Get current configuration"""
@@ -544,7 +1412,10 @@ def get_config():
         'success': True,
         'config': {
             'model': 'face_recognition (dlib)',
-            'tolerance': TOLERANCE
+            'tolerance': TOLERANCE,
+            'gallery_index': GALLERY_INDEX,
+            'gallery_size': len(face_gallery),
+            'pin_count': len(pin_index)
         }
     }), 200
 
@@ -555,9 +1426,52 @@ def health_check():
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'model': 'face_recognition',
-        'version': '2.0.1'
+        'version': '2.0.1',
+        'startup': startup.stats(),
+        'log_queue': log_writer.stats(),
+        'recognition_batches': recognition_batcher.stats() if recognition_batcher else None,
+        'frame_cache': frame_cache.stats() if frame_cache else None,
+        'frame_gate': frame_gate.stats() if frame_gate else None,
+        'admission': recognition_admission.stats() if recognition_admission else None,
+        'actuator': actuator.stats() if actuator else None,
+        'log_retention': log_retention.stats() if log_retention else None,
+        'storage': {
+            'backend': STORAGE_BACKEND,
+            'firebase_sync': replicator.stats() if replicator else None
+        }
+    }), 200
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness: process jalan dan bisa melayani HTTP (tidak menunggu model)"""
+    return jsonify({
+        'status': 'alive',
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness: model sudah di-load dan di-warm-up, siap menerima recognition"""
+    stats = startup.stats()
+    return jsonify({
+        'status': 'ready' if stats['ready'] else 'starting',
+        'timestamp': datetime.now().isoformat(),
+        **stats
+    }), 200 if stats['ready'] else 503
+
+@app.route('/api/streams', methods=['GET'])
+def get_streams():
+    """Status MJPEG stream consumer dan hasil recognition terakhir per kamera"""
+    return jsonify({
+        'success': True,
+        'streams': [consumer.stats() for consumer in stream_consumers]
     }), 200
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Metrics dalam Prometheus text exposition format"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/verify-pin', methods=['POST'])
 def verify_pin():
     """
@@ -583,9 +1497,6 @@ def verify_pin():
         
         input_pin = data['pin']
         
-        # Check di Firebase untuk PIN yang registered
-        registered_pins = pins_ref.get()
-        
         authorized = False
         user_name = 'Unknown'
         
@@ -593,13 +1504,13 @@ def verify_pin():
         if input_pin == DEFAULT_PIN:
             authorized = True
             user_name = 'Default PIN'
-        # Check registered PINs
-        elif registered_pins:
-            for pin_id, pin_data in registered_pins.items():
-                if pin_data.get('pin') == input_pin and pin_data.get('status') == 'active':
-                    authorized = True
-                    user_name = pin_data.get('user_name', 'PIN User')
-                    break
+        # Check registered PINs (lookup di index in-memory)
+        else:
+            with stage_timer('pin_lookup'):
+                found = pin_index.verify(input_pin)
+            if found:
+                authorized = True
+                user_name = found[1].get('user_name', 'PIN User')
         
         # Log access attempt
         log_data = {
@@ -610,7 +1521,7 @@ def verify_pin():
             'confidence': 100 if authorized else 0,
             'method': 'PIN'
         }
-        logs_ref.push(log_data)
+        write_access_log(log_data)
         
         if authorized:
             return jsonify({
@@ -698,14 +1609,12 @@ def create_pin():
             }), 400
         
         # Check if PIN already exists
-        registered_pins = pins_ref.get()
-        if registered_pins:
-            for pin_id, pin_data in registered_pins.items():
-                if pin_data.get('pin') == pin:
-                    return jsonify({
-                        'success': False,
-                        'message': f'PIN already registered to {pin_data.get("user_name")}'
-                    }), 400
+        existing = pin_index.find(pin)
+        if existing:
+            return jsonify({
+                'success': False,
+                'message': f'PIN already registered to {existing[1].get("user_name")}'
+            }), 400
         
         # Generate PIN ID
         pin_id = f"pin_{datetime.now().strftime('%Y%m%d%H%M%S')}"
@@ -719,6 +1628,7 @@ def create_pin():
         }
         
         pins_ref.child(pin_id).set(pin_data)
+        pin_index.upsert(pin_id, pin_data)
         
         return jsonify({
             'success': True,
@@ -745,6 +1655,7 @@ def delete_pin(pin_id):
             }), 404
         
         pins_ref.child(pin_id).delete()
+        pin_index.remove(pin_id)
         
         return jsonify({
             'success': True,
@@ -763,9 +1674,39 @@ import atexit
 @atexit.register
 def cleanup():
     """Cleanup temporary directory"""
+    face_gallery.stop()
+    pin_index.stop()
+    log_writer.stop()
+    if replicator is not None:
+        replicator.stop()
+    for consumer in stream_consumers:
+        consumer.stop()
+    if actuator is not None:
+        actuator.stop()
+    if recognition_batcher is not None:
+        recognition_batcher.stop()
+    if inference_pool is not None:
+        inference_pool.shutdown()
     if os.path.exists(TEMP_DIR):
         shutil.rmtree(TEMP_DIR)
 
+# Step startup yang berat dijalankan setelah import selesai, di background thread
+if inference_pool is None:
+    startup.add('model_warm_up', face_engine.warm_up)
+else:
+    # Worker load model dan warm-up sendiri, di sini hanya ditunggu
+    startup.add('inference_pool', inference_pool.wait_ready)
+if stream_consumers:
+    # Stream baru dibaca setelah model siap, frame pertama tidak kena cold model
+    startup.add('streams', start_stream_consumers)
+# Setelah ready: recognition sudah bisa jalan dari store lokal tanpa menunggu ini
+# Agregat /api/stats dibangun dari arsip + log (baca semua log)
+startup.add('access_stats', rebuild_access_stats, wait_ready=False)
+if firebase_enabled and local_store is not None:
+    # Init + bootstrap Firebase bisa sampai timeout (120 detik) saat offline
+    startup.add('firebase_sync', start_firebase_sync, wait_ready=False)
+startup.start()
+
 if __name__ == '__main__':
     print(f"""
     ╔════════════════════════════════════════════════╗
@@ -776,4 +1717,6 @@ if __name__ == '__main__':
     ║  Server: http://0.0.0.0:5000                   ║
     ╚════════════════════════════════════════════════╝
     """)
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Tanpa reloader: background worker (replicator, log writer, retention, stream consumer,
+    # inference pool) start saat import, reloader akan menjalankannya di dua process
+    app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False)
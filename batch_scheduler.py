@@ -0,0 +1,76 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Scheduler yang mengumpulkan request dalam window pendek (atau sampai
+    max_batch) lalu memprosesnya sebagai satu batch.
+
+    process_batch(items) harus return list hasil dengan urutan yang sama
+    dengan items. Setiap caller submit() mendapat hasilnya sendiri; exception
+    dari process_batch diteruskan ke semua caller di batch tersebut.
+    """
+
+    def __init__(self, process_batch, window=0.01, max_batch=8):
+        self._process_batch = process_batch
+        self._window = window
+        self._max_batch = max_batch
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'batches': 0, 'items': 0, 'max_batch_seen': 0}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def submit(self, item, timeout=None):
+        """Masukkan item ke batch berikutnya dan tunggu hasilnya"""
+        future = Future()
+        self._queue.put((item, future))
+        return future.result(timeout)
+
+    def stats(self):
+        batches = self._stats['batches']
+        return {
+            **self._stats,
+            'avg_batch_size': round(self._stats['items'] / batches, 2) if batches else 0,
+            'pending': self._queue.qsize()
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self._window
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._stats['batches'] += 1
+            self._stats['items'] += len(batch)
+            self._stats['max_batch_seen'] = max(self._stats['max_batch_seen'], len(batch))
+
+            try:
+                results = self._process_batch([item for item, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
@@ -0,0 +1,59 @@
+import base64
+
+import numpy as np
+
+# Dimensi face encoding dlib
+ENCODING_SIZE = 128
+
+# Versi format packed, disimpan sebagai prefix string: "v1:f32:<base64>"
+FORMAT_VERSION = 'v1'
+
+# Tipe yang didukung -> dtype little-endian
+DTYPES = {
+    'f32': np.dtype('<f4'),
+    'f16': np.dtype('<f2'),
+}
+
+
+def pack_encoding(encoding, fmt='f32'):
+    """
+    Pack encoding 128-d jadi string base64 dengan version tag, untuk RTDB.
+    f32 ~684 chars, f16 ~344 chars (JSON list 128 float sekitar 2.5 KB).
+    """
+    if fmt not in DTYPES:
+        raise ValueError(f"Unknown encoding format: {fmt}")
+    data = np.asarray(encoding, dtype=DTYPES[fmt]).reshape(ENCODING_SIZE).tobytes()
+    return f"{FORMAT_VERSION}:{fmt}:{base64.b64encode(data).decode('ascii')}"
+
+
+def encoding_to_bytes(value):
+    """Raw float32 bytes (512 bytes) dari encoding format apa pun, untuk cache in-memory"""
+    return unpack_encoding(value).tobytes()
+
+
+def is_packed(value):
+    return isinstance(value, str) and value.startswith(FORMAT_VERSION + ':')
+
+
+def unpack_encoding(value, out=None):
+    """
+    Decode encoding ke float32. value bisa string packed, raw float32 bytes,
+    atau JSON list lama. Kalau out diberikan (misalnya satu baris matrix
+    gallery), hasil langsung ditulis ke sana tanpa array perantara float64.
+    """
+    if isinstance(value, str):
+        version, fmt, payload = value.split(':', 2)
+        if version != FORMAT_VERSION or fmt not in DTYPES:
+            raise ValueError(f"Unsupported encoding format: {version}:{fmt}")
+        array = np.frombuffer(base64.b64decode(payload), dtype=DTYPES[fmt])
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        array = np.frombuffer(value, dtype=DTYPES['f32'])
+    else:
+        array = np.asarray(value, dtype=np.float32)
+
+    if array.size != ENCODING_SIZE:
+        raise ValueError(f"Encoding must have {ENCODING_SIZE} values, got {array.size}")
+    if out is None:
+        return array.astype(np.float32).reshape(ENCODING_SIZE)
+    out[:] = array
+    return out
@@ -598,26 +598,18 @@ void handleRecognizeFace() {
   
   Serial.printf("[RECOGNIZE] Image captured: %d bytes\n", fb->len);
   
-  // Convert to base64
-  String imageBase64 = base64::encode(fb->buf, fb->len);
-  Serial.printf("[RECOGNIZE] Base64 encoded: %d chars\n", imageBase64.length());
-  
   // Send to Flask for recognition
   if(WiFi.status() == WL_CONNECTED) {
     HTTPClient http;
     http.begin(flaskServerUrl);
-    http.addHeader("Content-Type", "application/json");
+    // Kirim JPEG mentah (tanpa base64/JSON), Flask decode langsung dari body
+    http.addHeader("Content-Type", "image/jpeg");
+    http.addHeader("X-Camera-Id", WiFi.macAddress());  // Untuk duplicate-frame cache per kamera
     http.setTimeout(20000); // Increased to 20 seconds for upload
     
-    // Create JSON payload
-    DynamicJsonDocument jsonDoc(imageBase64.length() + 200);
-    jsonDoc["image"] = imageBase64;
-    String jsonPayload;
-    serializeJson(jsonDoc, jsonPayload);
-    
     Serial.println("[RECOGNIZE] Uploading to Flask backend...");
     unsigned long startTime = millis();
-    int httpResponseCode = http.POST(jsonPayload);
+    int httpResponseCode = http.POST(fb->buf, fb->len);
     unsigned long uploadTime = millis() - startTime;
     Serial.printf("[RECOGNIZE] Upload completed in %lu ms\n", uploadTime);
     
@@ -704,27 +696,19 @@ void performAutoRecognition() {
   
   Serial.printf("[AUTO] ✓ Image captured: %d bytes\n", fb->len);
   
-  // Convert to base64
-  String imageBase64 = base64::encode(fb->buf, fb->len);
-  Serial.printf("[AUTO] Base64 encoded: %d chars\n", imageBase64.length());
-  
   Serial.println("[AUTO] Uploading to Flask backend...");
   
   // Send to Flask for recognition
   if(WiFi.status() == WL_CONNECTED) {
     HTTPClient http;
     http.begin(flaskServerUrl);
-    http.addHeader("Content-Type", "application/json");
+    // Kirim JPEG mentah (tanpa base64/JSON), Flask decode langsung dari body
+    http.addHeader("Content-Type", "image/jpeg");
+    http.addHeader("X-Camera-Id", WiFi.macAddress());  // Untuk duplicate-frame cache per kamera
     http.setTimeout(20000); // Increased to 20 seconds for upload
     
-    // Create JSON payload
-    DynamicJsonDocument jsonDoc(imageBase64.length() + 200);
-    jsonDoc["image"] = imageBase64;
-    String jsonPayload;
-    serializeJson(jsonDoc, jsonPayload);
-    
     unsigned long startTime = millis();
-    int httpResponseCode = http.POST(jsonPayload);
+    int httpResponseCode = http.POST(fb->buf, fb->len);
     unsigned long uploadTime = millis() - startTime;
     
     Serial.printf("[AUTO] Upload completed in %lu ms\n", uploadTime);
@@ -736,7 +720,12 @@ void performAutoRecognition() {
       Serial.printf("[AUTO] Response (%d): %s\n", httpResponseCode, response.c_str());
       
       DynamicJsonDocument responseDoc(1024);
-      if (deserializeJson(responseDoc, response) == DeserializationError::Ok) {
+      if (httpResponseCode != HTTP_CODE_OK) {
+        // 503 (server warm-up/overload/frame superseded) dan error 4xx/5xx
+        // bukan hasil recognition - jangan dianggap wajah tidak dikenal
+        Serial.printf("[AUTO] ⚠️ Server returned %d, skipping (no alert)\n", httpResponseCode);
+        lastRecognitionResult = "Server unavailable (" + String(httpResponseCode) + ")";
+      } else if (deserializeJson(responseDoc, response) == DeserializationError::Ok) {
         bool authorized = responseDoc["authorized"] | false;
         String name = "Unknown";
         float confidence = 0.0;
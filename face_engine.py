@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Sisi terpanjang image untuk HOG detection, image lebih besar di-downscale dulu
+DETECTION_MAX_SIDE = int(os.environ.get('DETECTION_MAX_SIDE', 800))
+
+# Margin crop di sekitar face box (relatif ke ukuran box) untuk encoding full-resolution
+ENCODING_CROP_MARGIN = 0.5
+
+# Callback (stage, seconds) untuk metrics, di-set oleh server
+stage_observer = None
+
+def _observe(stage, started):
+    if stage_observer is not None:
+        stage_observer(stage, time.perf_counter() - started)
+
+
+_face_recognition = None
+_models_lock = threading.Lock()
+
+def load_models():
+    """
+    Import face_recognition (load model dlib) saat pertama dibutuhkan, bukan
+    saat module di-import, supaya process cepat start. Aman dipanggil dari
+    banyak thread, model hanya di-load sekali per process.
+    """
+    global _face_recognition
+    if _face_recognition is None:
+        with _models_lock:
+            if _face_recognition is None:
+                import face_recognition
+                _face_recognition = face_recognition
+    return _face_recognition
+
+def warm_up(size=160):
+    """
+    Load model lalu jalankan detection + encoding dummy, supaya alokasi dan
+    inisialisasi pertama dlib tidak dibayar oleh request user. Return durasi (detik).
+    """
+    started = time.perf_counter()
+    face_recognition = load_models()
+    image = np.zeros((size, size, 3), dtype=np.uint8)
+    face_recognition.face_locations(image, model="hog")
+    face_recognition.face_encodings(image, [(size // 4, size * 3 // 4, size * 3 // 4, size // 4)])
+    return time.perf_counter() - started
+
+def detection_scale(image):
+    """Faktor downscale untuk HOG detection, supaya sisi terpanjang <= DETECTION_MAX_SIDE"""
+    longest = max(image.shape[:2])
+    return max(1.0, longest / DETECTION_MAX_SIDE)
+
+def locate_face(image):
+    """
+    HOG detection di image yang sudah di-downscale (kalau image besar), lalu
+    box di-map balik ke full-resolution. Return (rgb_crop, location, error)
+    dengan location relatif terhadap crop.
+    """
+    started = time.perf_counter()
+    height, width = image.shape[:2]
+    scale = detection_scale(image)
+    
+    if scale > 1.0:
+        small = cv2.resize(
+            image,
+            (max(1, round(width / scale)), max(1, round(height / scale))),
+            interpolation=cv2.INTER_AREA
+        )
+    else:
+        small = image
+    
+    # Convert BGR to RGB (OpenCV uses BGR, face_recognition uses RGB)
+    rgb_small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+    
+    # Find face locations
+    face_locations = load_models().face_locations(rgb_small, model="hog")
+    _observe('face_detection', started)
+    
+    if not face_locations:
+        return None, None, "No face detected"
+    
+    if len(face_locations) > 1:
+        return None, None, "Multiple faces detected. Please ensure only one face is visible"
+    
+    # Map box ke koordinat full-resolution
+    top, right, bottom, left = face_locations[0]
+    top, bottom = round(top * scale), min(height, round(bottom * scale))
+    left, right = round(left * scale), min(width, round(right * scale))
+    
+    # Crop dengan margin supaya landmark tetap di dalam crop, convert hanya crop
+    margin_y = int((bottom - top) * ENCODING_CROP_MARGIN)
+    margin_x = int((right - left) * ENCODING_CROP_MARGIN)
+    y0, y1 = max(0, top - margin_y), min(height, bottom + margin_y)
+    x0, x1 = max(0, left - margin_x), min(width, right + margin_x)
+    rgb_crop = cv2.cvtColor(image[y0:y1, x0:x1], cv2.COLOR_BGR2RGB)
+    
+    return rgb_crop, (top - y0, right - x0, bottom - y0, left - x0), None
+
+def get_face_encoding(image):
+    """
+    Extract face encoding menggunakan face_recognition.
+    Detection di resolusi rendah, encoding dari crop full-resolution.
+    """
+    try:
+        rgb_crop, location, error = locate_face(image)
+        if error:
+            return None, error
+        
+        # Get face encoding
+        started = time.perf_counter()
+        face_encodings = load_models().face_encodings(rgb_crop, [location])
+        _observe('face_encoding', started)
+        
+        if not face_encodings:
+            return None, "Could not encode face"
+        
+        return face_encodings[0].tolist(), None
+        
+    except Exception as e:
+        return None, f"Error extracting face: {str(e)}"
+
+def get_face_encodings_batch(images):
+    """
+    Versi batch dari get_face_encoding: detection per image, lalu semua
+    face di-encode dengan satu panggilan batch ResNet dlib.
+    Return list (encoding, error) dengan urutan sama seperti images.
+    """
+    results = [None] * len(images)
+    crops = []
+    
+    for i, image in enumerate(images):
+        try:
+            rgb_crop, location, error = locate_face(image)
+        except Exception as e:
+            rgb_crop, location, error = None, None, f"Error extracting face: {str(e)}"
+        if error:
+            results[i] = (None, error)
+        else:
+            crops.append((i, rgb_crop, location))
+    
+    if not crops:
+        return results
+    
+    started = time.perf_counter()
+    try:
+        encodings = _encode_crops_batch(crops)
+    except Exception:
+        # dlib tanpa batch API, encode satu per satu
+        encodings = [
+            next(iter(load_models().face_encodings(rgb_crop, [location])), None)
+            for _, rgb_crop, location in crops
+        ]
+    _observe('face_encoding_batch', started)
+    
+    for (i, _, _), encoding in zip(crops, encodings):
+        if encoding is None:
+            results[i] = (None, "Could not encode face")
+        else:
+            results[i] = ([float(v) for v in encoding], None)
+    
+    return results
+
+def _encode_crops_batch(crops):
+    """Satu panggilan compute_face_descriptor untuk semua crop"""
+    import dlib
+    from face_recognition import api
+    
+    batch_images = []
+    batch_faces = []
+    for _, rgb_crop, location in crops:
+        detections = dlib.full_object_detections()
+        detections.append(api._raw_face_landmarks(rgb_crop, [location], model="small")[0])
+        batch_images.append(rgb_crop)
+        batch_faces.append(detections)
+    
+    descriptors = api.face_encoder.compute_face_descriptor(batch_images, batch_faces, 1)
+    return [descriptor[0] for descriptor in descriptors]
@@ -0,0 +1,401 @@
+import bisect
+import threading
+
+import numpy as np
+
+from encoding_codec import ENCODING_SIZE, encoding_to_bytes, unpack_encoding
+
+
+# Field biometric yang tidak ikut di metadata listing
+_TEMPLATE_FIELDS = ('face_encoding', 'face_templates')
+
+
+def _metadata(record):
+    return {key: value for key, value in record.items() if key not in _TEMPLATE_FIELDS}
+
+
+class FaceGallery:
+    """
+    Cache in-process untuk face encodings dari node `users` di Firebase RTDB.
+
+    Gallery di-load sekali saat startup, lalu di-update secara incremental
+    lewat listener RTDB dan lewat upsert/update/remove dari endpoint. Full
+    reload berkala hanya sebagai safety net kalau listener terputus.
+
+    Encodings user yang active disimpan dalam satu matrix float32 (N x 128)
+    yang contiguous, dengan array id dan metadata yang sejajar per baris,
+    sehingga matching ke seluruh gallery cukup satu kali matrix-vector product.
+
+    face_encoding boleh dalam format packed (lihat encoding_codec) atau JSON
+    list lama; keduanya di-decode langsung ke baris matrix. Record user yang
+    disimpan di cache memakai raw float32 bytes, bukan list float Python.
+    Record yang sama juga dipakai untuk listing metadata user (users(), user())
+    tanpa download encoding dari storage.
+
+    User bisa punya template tambahan (face_templates, dari bulk enrolment).
+    Setiap template jadi baris sendiri dengan key "<user_id>#<n>" ('#' tidak
+    valid di key RTDB), dan hasil match di-dedupe per user.
+
+    Untuk gallery besar bisa dipasang ANN index (lihat ann_index.IVFIndex).
+    Index di-update incremental bersama matrix, dan dipakai untuk matching
+    begitu jumlah user >= ann_min_size; di bawah itu tetap pakai flat scan.
+    """
+
+    def __init__(self, users_ref, refresh_interval=300, capacity=64,
+                 index=None, index_path=None, ann_min_size=1000):
+        self._ref = users_ref
+        self._refresh_interval = refresh_interval
+        self._index = index
+        self._index_path = index_path
+        self._ann_min_size = ann_min_size
+        self._index_dirty = False
+        self._lock = threading.RLock()
+        self._users = {}
+        self._listener = None
+        self._stop = threading.Event()
+        self.version = 0
+
+        # Matrix gallery: baris [0, _count) valid, sisanya kapasitas cadangan
+        self._matrix = np.zeros((capacity, ENCODING_SIZE), dtype=np.float32)
+        self._sq_norms = np.zeros(capacity, dtype=np.float32)
+        self._ids = []
+        self._meta = []
+        self._rows = {}
+        self._count = 0
+        self._template_rows = 0
+        self._max_templates = 1
+
+    def start(self):
+        """Initial load, lalu pasang listener dan refresh thread"""
+        self.load()
+
+        try:
+            self._listener = self._ref.listen(self._on_event)
+        except Exception as e:
+            print(f"Gallery listener unavailable, using periodic refresh only: {e}")
+
+        if self._refresh_interval:
+            thread = threading.Thread(target=self._refresh_loop, daemon=True)
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        self.save_index()
+
+    def save_index(self):
+        """Persist ANN index ke disk kalau ada perubahan"""
+        with self._lock:
+            if self._index is None or not self._index_path or not self._index.trained:
+                return
+            if not self._index_dirty:
+                return
+            self._index.save(self._index_path)
+            self._index_dirty = False
+
+    def load(self):
+        """Full reload dari Firebase"""
+        users = self._ref.get() or {}
+        with self._lock:
+            self._replace_all(users)
+
+    def user(self, user_id):
+        """Metadata satu user (tanpa encoding), atau None"""
+        with self._lock:
+            record = self._users.get(user_id)
+            return _metadata(record) if record is not None else None
+
+    def users(self, status=None, cursor=None, limit=None):
+        """
+        Metadata user (tanpa encoding) urut user_id, untuk listing tanpa round
+        trip ke storage. cursor = user_id terakhir dari halaman sebelumnya.
+        Return (list of (user_id, metadata), next_cursor).
+        """
+        with self._lock:
+            user_ids = sorted(self._users)
+            start = bisect.bisect_right(user_ids, cursor) if cursor else 0
+            page = []
+            for user_id in user_ids[start:]:
+                record = self._users[user_id]
+                if status and record.get('status', 'active') != status:
+                    continue
+                if limit and len(page) == limit:
+                    return page, page[-1][0]
+                page.append((user_id, _metadata(record)))
+            return page, None
+
+    def __len__(self):
+        """Jumlah active user (bukan jumlah baris template)"""
+        with self._lock:
+            return self._count - self._template_rows
+
+    def match(self, encoding, tolerance, k=3):
+        """
+        Bandingkan satu encoding dengan seluruh gallery dalam satu pass.
+
+        Return None kalau gallery kosong, selain itu dict:
+            best: kandidat terdekat kalau distance <= tolerance, else None
+            top_k: k kandidat terdekat (urut distance ascending)
+            margin: selisih distance kandidat kedua dan pertama (None kalau < 2 user)
+        """
+        return self.match_many([encoding], tolerance, k)[0]
+
+    def match_many(self, encodings, tolerance, k=3):
+        """Versi batch dari match(): semua distance dihitung dengan satu matrix product"""
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        # Ambil kandidat lebih banyak kalau ada user dengan beberapa template
+        n = max(k, 2) * self._max_templates
+
+        with self._lock:
+            count = self._count
+            if count == 0:
+                return [None] * len(queries)
+
+            if self._use_index(count):
+                # Kandidat dari ANN index sudah di-rerank dengan distance exact
+                candidates = [
+                    [
+                        {**self._meta[self._rows[key]], 'distance': distance}
+                        for key, distance in self._index.search(query, n)
+                    ]
+                    for query in queries
+                ]
+            else:
+                distances = self._distances(queries, count)
+                n = min(n, count)
+                if n < count:
+                    nearest = np.argpartition(distances, n - 1, axis=1)[:, :n]
+                else:
+                    nearest = np.tile(np.arange(count), (len(queries), 1))
+                order = np.take_along_axis(distances, nearest, axis=1).argsort(axis=1)
+                nearest = np.take_along_axis(nearest, order, axis=1)
+
+                candidates = [
+                    [
+                        {**self._meta[row], 'distance': float(distances[q, row])}
+                        for row in rows
+                    ]
+                    for q, rows in enumerate(nearest)
+                ]
+
+        results = []
+        for top_k in candidates:
+            if self._max_templates > 1:
+                # Satu kandidat per user (template terdekat)
+                seen = set()
+                top_k = [c for c in top_k if c['user_id'] not in seen and not seen.add(c['user_id'])]
+            if not top_k:
+                results.append({'best': None, 'top_k': [], 'margin': None})
+                continue
+            best = top_k[0] if top_k[0]['distance'] <= tolerance else None
+            margin = top_k[1]['distance'] - top_k[0]['distance'] if len(top_k) > 1 else None
+            results.append({'best': best, 'top_k': top_k[:k], 'margin': margin})
+        return results
+
+    def upsert(self, user_id, user_data):
+        """Replace seluruh record user (register)"""
+        with self._lock:
+            self._set_user(user_id, user_data)
+            self.version += 1
+
+    def update(self, user_id, fields):
+        """Partial update field user (misalnya status atau name)"""
+        with self._lock:
+            record = self._users.get(user_id)
+            if record is None:
+                return
+            record = dict(record)
+            record.update(fields)
+            self._set_user(user_id, record)
+            self.version += 1
+
+    def remove(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+            self._drop_row(user_id)
+            self._drop_templates(user_id)
+            self.version += 1
+
+    def _use_index(self, count):
+        return self._index is not None and self._index.trained and count >= self._ann_min_size
+
+    def _distances(self, queries, count):
+        # ||a - q||^2 = ||a||^2 - 2 a.q + ||q||^2, dengan a.q sebagai satu BLAS call (B x N)
+        sq = self._sq_norms[:count][None, :] - 2.0 * (queries @ self._matrix[:count].T)
+        sq += (queries * queries).sum(axis=1)[:, None]
+        np.maximum(sq, 0.0, out=sq)
+        return np.sqrt(sq, out=sq)
+
+    def _replace_all(self, users):
+        self._users = {}
+        self._ids = []
+        self._meta = []
+        self._rows = {}
+        self._count = 0
+        self._template_rows = 0
+        self._max_templates = 1
+        if len(users) > len(self._matrix):
+            self._resize(len(users))
+        for user_id, user_data in users.items():
+            self._set_user(user_id, user_data, update_index=False)
+        self._sync_index()
+        self.version += 1
+
+    def _sync_index(self):
+        """Bulk sync ANN index dengan isi matrix (train dulu kalau perlu)"""
+        if self._index is None:
+            return
+        vectors = self._matrix[:self._count]
+        if self._index.needs_training(self._count):
+            self._index.train(vectors)
+            self._index_dirty = True
+        if self._index.trained and self._index.sync(list(self._ids), vectors):
+            self._index_dirty = True
+
+    def _set_user(self, user_id, user_data, update_index=True):
+        if not isinstance(user_data, dict):
+            self._users.pop(user_id, None)
+            self._drop_row(user_id)
+            self._drop_templates(user_id)
+            return
+
+        if 'face_encoding' in user_data:
+            try:
+                encoding = encoding_to_bytes(user_data['face_encoding'])
+                templates = [encoding_to_bytes(t) for t in user_data.get('face_templates') or []]
+            except (ValueError, TypeError) as e:
+                # Metadata tetap di cache (listing, get/delete lewat API), hanya tidak ikut matching
+                print(f"Excluding user {user_id} with invalid face_encoding from matching: {e}")
+                self._users[user_id] = _metadata(user_data)
+                self._drop_row(user_id)
+                self._drop_templates(user_id)
+                return
+            user_data = {**user_data, 'face_encoding': encoding}
+            if templates:
+                user_data['face_templates'] = templates
+
+        self._users[user_id] = user_data
+
+        if 'face_encoding' in user_data and user_data.get('status') == 'active':
+            meta = {
+                'user_id': user_id,
+                'name': user_data.get('name', 'Unknown'),
+                'email': user_data.get('email', ''),
+                'phone': user_data.get('phone', '')
+            }
+            self._put_row(user_id, user_data['face_encoding'], meta, update_index)
+            templates = user_data.get('face_templates') or []
+            for i, template in enumerate(templates, 1):
+                self._put_row(f"{user_id}#{i}", template, meta, update_index)
+            self._drop_templates(user_id, start=len(templates) + 1)
+            self._max_templates = max(self._max_templates, len(templates) + 1)
+        else:
+            self._drop_row(user_id)
+            self._drop_templates(user_id)
+
+    def _drop_templates(self, user_id, start=1):
+        i = start
+        while f"{user_id}#{i}" in self._rows:
+            self._drop_row(f"{user_id}#{i}")
+            i += 1
+
+    def _put_row(self, user_id, encoding, meta, update_index=True):
+        row = self._rows.get(user_id)
+        if row is None:
+            if self._count == len(self._matrix):
+                self._grow()
+            row = self._count
+            self._count += 1
+            if meta['user_id'] != user_id:
+                self._template_rows += 1
+            self._rows[user_id] = row
+            self._ids.append(user_id)
+            self._meta.append(meta)
+        else:
+            self._meta[row] = meta
+
+        unpack_encoding(encoding, out=self._matrix[row])
+        self._sq_norms[row] = np.dot(self._matrix[row], self._matrix[row])
+
+        if update_index and self._index is not None and self._index.trained:
+            self._index.add(user_id, self._matrix[row])
+            self._index_dirty = True
+
+    def _drop_row(self, user_id):
+        row = self._rows.pop(user_id, None)
+        if row is None:
+            return
+        if self._meta[row]['user_id'] != user_id:
+            self._template_rows -= 1
+
+        if self._index is not None and user_id in self._index:
+            self._index.remove(user_id)
+            self._index_dirty = True
+
+        # Pindahkan baris terakhir ke posisi yang dihapus supaya matrix tetap rapat
+        last = self._count - 1
+        if row != last:
+            moved_id = self._ids[last]
+            self._matrix[row] = self._matrix[last]
+            self._sq_norms[row] = self._sq_norms[last]
+            self._ids[row] = moved_id
+            self._meta[row] = self._meta[last]
+            self._rows[moved_id] = row
+        self._ids.pop()
+        self._meta.pop()
+        self._count = last
+
+    def _grow(self):
+        self._resize(max(len(self._matrix) * 2, 1))
+
+    def _resize(self, capacity):
+        matrix = np.zeros((capacity, ENCODING_SIZE), dtype=np.float32)
+        matrix[:self._count] = self._matrix[:self._count]
+        sq_norms = np.zeros(capacity, dtype=np.float32)
+        sq_norms[:self._count] = self._sq_norms[:self._count]
+        self._matrix = matrix
+        self._sq_norms = sq_norms
+
+    def _on_event(self, event):
+        """Apply event put/patch dari RTDB listener ke cache"""
+        try:
+            if event.event_type == 'patch':
+                for key, value in (event.data or {}).items():
+                    self._apply(f"{event.path.rstrip('/')}/{key}", value)
+            else:
+                self._apply(event.path, event.data)
+        except Exception as e:
+            print(f"Error applying gallery event: {e}")
+
+    def _apply(self, path, data):
+        segments = [s for s in path.split('/') if s]
+
+        if len(segments) > 2 or (len(segments) == 2 and segments[0] not in self._users):
+            # Nested path (misalnya face_encoding/3), ambil ulang user tersebut
+            self.upsert(segments[0], self._ref.child(segments[0]).get())
+            return
+
+        with self._lock:
+            if not segments:
+                self._replace_all(data or {})
+                return
+            elif len(segments) == 1:
+                self._set_user(segments[0], data)
+            else:
+                record = dict(self._users.get(segments[0], {}))
+                if data is None:
+                    record.pop(segments[1], None)
+                else:
+                    record[segments[1]] = data
+                self._set_user(segments[0], record)
+            self.version += 1
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self._refresh_interval):
+            try:
+                self.load()
+                self.save_index()
+            except Exception as e:
+                print(f"Error refreshing gallery: {e}")
@@ -0,0 +1,90 @@
+"""
+Stand-in lokal untuk ESP8266 relay controller, untuk test server.py tanpa
+hardware. Menerima GET/POST ke path apa pun (/unlock, /incorrect, ...),
+mencatat perintah yang masuk (beserta body POST), dan bisa dibuat lambat
+atau gagal.
+
+Usage:
+    python fake_esp8266.py --port 8266
+    python fake_esp8266.py --port 8266 --delay 5        # simulasi ESP8266 hang
+    python fake_esp8266.py --port 8266 --fail-rate 0.5  # 50% response 500
+
+Lalu jalankan server dengan ACTUATOR_URL=http://127.0.0.1:8266
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeESP8266:
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0, fail_rate=0.0):
+        self.commands = []
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        device = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive seperti ESP8266WebServer
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                # Body POST harus dibaca habis, kalau tidak sisa body terbaca sebagai request berikutnya
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = self.rfile.read(length) if length else b""
+                if device.delay:
+                    time.sleep(device.delay)
+                device.commands.append((time.time(), self.command, self.path, payload.decode(errors="replace")))
+                failed = random.random() < device.fail_rate
+                body = json.dumps({"success": not failed, "command": self.path.strip("/")}).encode()
+                try:
+                    self.send_response(500 if failed else 200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client sudah timeout duluan
+                    self.close_connection = True
+
+            do_POST = do_GET
+
+            def log_message(self, fmt, *args):
+                print(f"[fake-esp8266] {self.address_string()} {fmt % args}")
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8266)
+    parser.add_argument("--delay", type=float, default=0.0, help="Delay per response (detik)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Probabilitas response 500")
+    args = parser.parse_args()
+
+    device = FakeESP8266(args.host, args.port, args.delay, args.fail_rate)
+    print(f"Fake ESP8266 listening on {device.url}")
+    try:
+        device._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+ENCODING_SIZE = 128
+
+MATRIX_FILE = "gallery.npy"
+NORMS_FILE = "gallery_norms.npy"
+INDEX_FILE = "gallery_ids.json"
+
+
+class MmapGallery:
+    """
+    Gallery embedding multi-user untuk edge server.
+
+    Sumber: satu file <user_id>.npy per user di gallery_dir (shape (128,)
+    atau (n_samples, 128)). File-file ini di-compile jadi satu matrix
+    float32 (gallery.npy), squared norm per baris (gallery_norms.npy) dan
+    index id (gallery_ids.json) di gallery_dir/compiled, lalu di-load dengan
+    mmap sehingga startup tidak tergantung jumlah user.
+
+    Thread watcher mengecek perubahan file sumber (mtime/size); kalau ada,
+    gallery di-compile ulang ke file sementara, di-rename secara atomic,
+    lalu di-map ulang. Request yang sedang jalan tetap memakai snapshot lama.
+    """
+
+    def __init__(self, gallery_dir, poll_interval=2.0):
+        self._dir = gallery_dir
+        self._compiled_dir = os.path.join(gallery_dir, "compiled")
+        self._poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # Snapshot (matrix, sq_norms, ids, sources) diganti sebagai satu tuple
+        self._snapshot = (np.zeros((0, ENCODING_SIZE), np.float32), np.zeros(0, np.float32), [], {})
+
+    def start(self):
+        self.reload()
+        if self._poll_interval:
+            threading.Thread(target=self._watch, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def __len__(self):
+        return len(set(self._snapshot[2]))
+
+    def reload(self):
+        """Compile ulang kalau sumber berubah, lalu map matrix hasil compile"""
+        with self._lock:
+            sources = self._scan()
+            index = self._read_index()
+            if index is None or index.get("sources") != sources:
+                index = self._compile(sources)
+
+            matrix = np.load(os.path.join(self._compiled_dir, MATRIX_FILE), mmap_mode="r")
+            sq_norms = np.load(os.path.join(self._compiled_dir, NORMS_FILE), mmap_mode="r")
+            self._snapshot = (matrix, sq_norms, index["ids"], sources)
+            return len(index["ids"])
+
+    def match(self, encoding):
+        """Return (user_id, distance) terdekat, atau (None, None) kalau gallery kosong"""
+        matrix, sq_norms, ids, _ = self._snapshot
+        if not ids:
+            return None, None
+
+        query = np.asarray(encoding, dtype=np.float32)
+        sq = sq_norms - 2.0 * (matrix @ query) + query @ query
+        best = int(np.argmin(sq))
+        return ids[best], float(np.sqrt(max(sq[best], 0.0)))
+
+    def _scan(self):
+        sources = {}
+        if not os.path.isdir(self._dir):
+            return sources
+        for entry in os.scandir(self._dir):
+            if entry.is_file() and entry.name.endswith(".npy"):
+                stat = entry.stat()
+                sources[entry.name] = [stat.st_mtime_ns, stat.st_size]
+        return sources
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self._compiled_dir, INDEX_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _compile(self, sources):
+        rows, ids = [], []
+        for name in sorted(sources):
+            try:
+                embeddings = np.load(os.path.join(self._dir, name)).astype(np.float32).reshape(-1, ENCODING_SIZE)
+            except (OSError, ValueError) as e:
+                print(f"Skipping {name}: {e}")
+                continue
+            rows.append(embeddings)
+            ids.extend([name[:-len(".npy")]] * len(embeddings))
+
+        matrix = np.concatenate(rows) if rows else np.zeros((0, ENCODING_SIZE), np.float32)
+        index = {"ids": ids, "sources": sources}
+
+        # Tulis ke file sementara lalu rename, supaya reader tidak pernah melihat file setengah jadi
+        os.makedirs(self._compiled_dir, exist_ok=True)
+        outputs = [
+            (MATRIX_FILE, lambda f: np.save(f, matrix)),
+            (NORMS_FILE, lambda f: np.save(f, np.einsum("ij,ij->i", matrix, matrix))),
+            # Index ditulis terakhir: index yang valid berarti matrix dan norms sudah lengkap
+            (INDEX_FILE, lambda f: f.write(json.dumps(index).encode())),
+        ]
+        for name, write in outputs:
+            path = os.path.join(self._compiled_dir, name)
+            with open(path + ".tmp", "wb") as f:
+                write(f)
+            os.replace(path + ".tmp", path)
+
+        print(f"Compiled gallery: {len(set(ids))} users, {len(ids)} embeddings")
+        return index
+
+    def _watch(self):
+        while not self._stop.wait(self._poll_interval):
+            try:
+                if self._scan() != self._snapshot[3]:
+                    self.reload()
+            except Exception as e:
+                print(f"Error reloading gallery: {e}")
@@ -1,18 +1,46 @@
 from flask import Flask, request, jsonify
-import numpy as np
+import io
+import os
+import shutil
+import sys
 import face_recognition
 
+# ActuatorDispatcher dipakai bersama dengan server utama (root repo)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from actuator import ActuatorDispatcher
+from mmap_gallery import MmapGallery
+
 app = Flask(__name__)
 
-# Load embedding user
-user_encoding = np.load("user1.npy")   # file embedding
+# Folder embedding: satu file <user_id>.npy per anggota rumah
+GALLERY_DIR = os.environ.get("GALLERY_DIR", "gallery")
+GALLERY_POLL_INTERVAL = float(os.environ.get("GALLERY_POLL_INTERVAL", 2.0))
+
+# Setup lama (satu user1.npy) dipindah otomatis ke folder gallery
+if not os.path.isdir(GALLERY_DIR) and os.path.exists("user1.npy"):
+    os.makedirs(GALLERY_DIR)
+    shutil.copy("user1.npy", os.path.join(GALLERY_DIR, "user1.npy"))
+
+# Load embedding semua user (mmap, hot reload kalau folder berubah)
+gallery = MmapGallery(GALLERY_DIR, poll_interval=GALLERY_POLL_INTERVAL)
+gallery.start()
+print(f"Gallery loaded: {len(gallery)} users")
+
+# Perintah ke ESP8266 dikirim di background, response ke kamera tidak menunggu relay
+ACTUATOR_URL = os.environ.get("ACTUATOR_URL", "http://192.168.1.20")
+actuator = ActuatorDispatcher(
+    ACTUATOR_URL,
+    timeout=(float(os.environ.get("ACTUATOR_CONNECT_TIMEOUT", 0.5)),
+             float(os.environ.get("ACTUATOR_READ_TIMEOUT", 1.0))),
+    dedupe_window=float(os.environ.get("ACTUATOR_DEDUPE_SECONDS", 3.0))
+)
+actuator.start()
 
 @app.route("/process-face", methods=["POST"])
 def process():
     img_bytes = request.data
-    
-    np_img = np.frombuffer(img_bytes, np.uint8)
-    img = face_recognition.load_image_file(np_img)
+
+    img = face_recognition.load_image_file(io.BytesIO(img_bytes))
 
     face_locations = face_recognition.face_locations(img)
     if len(face_locations) == 0:
@@ -23,18 +51,20 @@ def process():
         return jsonify({"match": False, "reason": "no encoding"})
 
     face = encodings[0]
-    distance = face_recognition.face_distance([user_encoding], face)[0]
+    user_id, distance = gallery.match(face)
+    if user_id is None:
+        return jsonify({"match": False, "reason": "no users enrolled"})
     similarity = 1 - distance
 
-    print("Similarity:", similarity)
+    print("Best match:", user_id, "Similarity:", similarity)
 
     if similarity >= 0.60:
         # Kirim perintah ke ESP8266
-        requests.get("http://192.168.1.20/unlock")
-        return jsonify({"match": True, "accuracy": float(similarity)})
+        actuator.dispatch("unlock")
+        return jsonify({"match": True, "user": user_id, "accuracy": float(similarity)})
 
     else:
-        requests.get("http://192.168.1.20/incorrect")
+        actuator.dispatch("incorrect")
         return jsonify({"match": False, "accuracy": float(similarity)})
 
 app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,77 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+def difference_hash(image, hash_size=8):
+    """dHash 64-bit dari frame BGR: grayscale kecil, bandingkan pixel bersebelahan"""
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    bits = gray[:, 1:] > gray[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+class FrameCache:
+    """
+    Cache keputusan recognition per kamera berdasarkan fingerprint frame.
+
+    Kalau frame baru dari kamera yang sama hampir identik (hamming distance
+    dHash <= max_distance) dengan frame sebelumnya dan belum lewat TTL,
+    keputusan sebelumnya dipakai lagi tanpa menjalankan pipeline. Entry juga
+    hanya valid untuk generation (versi gallery) yang sama.
+
+    Hanya keputusan yang tidak membuka pintu (tidak ada wajah, wajah tidak
+    dikenal, dll) yang di-cache. Wajah berbeda di posisi yang sama bisa punya
+    dHash yang hampir sama, jadi response authorized selalu lewat matching
+    dan access log lagi.
+    """
+
+    def __init__(self, ttl=10.0, max_distance=4):
+        self._ttl = ttl
+        self._max_distance = max_distance
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+        self._pipeline_seconds = 0.0
+
+    def lookup(self, source, fingerprint, generation=0):
+        """Return response yang di-cache untuk source, atau None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(source)
+            if entry is not None:
+                stored_fingerprint, stored_generation, response, expires_at = entry
+                if (now < expires_at and stored_generation == generation
+                        and bin(stored_fingerprint ^ fingerprint).count('1') <= self._max_distance):
+                    self._hits += 1
+                    return response
+                if now >= expires_at or stored_generation != generation:
+                    del self._entries[source]
+            self._misses += 1
+            return None
+
+    def store(self, source, fingerprint, response, generation=0, pipeline_seconds=0.0):
+        """Simpan response terakhir untuk source (satu entry per kamera)"""
+        with self._lock:
+            self._pipeline_seconds += pipeline_seconds
+            if response.get('authorized'):
+                # Jangan sampai frame berikutnya dicocokkan dengan frame sebelum unlock
+                self._entries.pop(source, None)
+                return
+            self._entries[source] = (fingerprint, generation, response, time.monotonic() + self._ttl)
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._misses
+            avg_pipeline = self._pipeline_seconds / self._misses if self._misses else 0.0
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / total, 4) if total else 0.0,
+                'sources': len(self._entries),
+                # Perkiraan waktu pipeline yang dihemat: hits x rata-rata waktu miss
+                'estimated_seconds_saved': round(self._hits * avg_pipeline, 3)
+            }
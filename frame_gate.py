@@ -0,0 +1,161 @@
+import threading
+import time
+
+import cv2
+
+
+class GateRejection:
+    """Alasan frame ditolak sebelum HOG detection (gate, reason code, nilai yang diukur)"""
+
+    def __init__(self, gate, reason, value):
+        self.gate = gate
+        self.reason = reason
+        self.value = value
+
+    def to_dict(self):
+        return {'gate': self.gate, 'reason': self.reason, 'value': round(float(self.value), 2)}
+
+
+class FrameGate:
+    """
+    Cascade filter murah di depan face detection untuk frame recognition.
+
+    Semua gate bekerja di satu grayscale kecil (sisi terpanjang work_size),
+    urut dari yang paling murah:
+      1. motion     - frame hampir sama dengan frame sebelumnya dari kamera
+                      yang sama, dan frame sebelumnya tidak berisi wajah
+      2. exposure   - rata-rata brightness terlalu gelap/terang, atau
+                      contrast (std dev) terlalu rendah
+      3. sharpness  - variance Laplacian terlalu kecil (blur)
+      4. detector   - opsional, Haar cascade OpenCV tidak menemukan wajah
+
+    check() berhenti di gate pertama yang menolak dan return GateRejection
+    (None kalau frame lolos). Threshold 0 mematikan gate tersebut.
+    """
+
+    GATES = ('motion', 'exposure', 'sharpness', 'detector')
+
+    def __init__(self, motion_threshold=2.0, min_brightness=30, max_brightness=230,
+                 min_contrast=10, min_sharpness=20, detector=None, work_size=320, max_sources=256):
+        self._motion_threshold = motion_threshold
+        self._min_brightness = min_brightness
+        self._max_brightness = max_brightness
+        self._min_contrast = min_contrast
+        self._min_sharpness = min_sharpness
+        self._detector = detector
+        self._work_size = work_size
+        self._max_sources = max_sources
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # source -> (grayscale kecil frame terakhir, frame terakhir yang diproses berisi wajah)
+        self._previous = {}
+        self._stats = {gate: {'checked': 0, 'rejected': 0} for gate in self.GATES}
+        self._frames = 0
+        self._passed = 0
+        self._seconds = 0.0
+
+        if detector not in (None, 'haar'):
+            raise ValueError(f"Unknown frame gate detector: {detector}")
+        if detector == 'haar' and (not hasattr(cv2, 'CascadeClassifier') or self._cascade().empty()):
+            raise ValueError("Haar frame gate detector needs an OpenCV build with CascadeClassifier and data files")
+
+    def check(self, source, image):
+        """Jalankan cascade untuk satu frame BGR, return GateRejection atau None"""
+        started = time.perf_counter()
+        rejection = self._check(source, image)
+        with self._lock:
+            self._frames += 1
+            self._seconds += time.perf_counter() - started
+            if rejection is None:
+                self._passed += 1
+        return rejection
+
+    def record_result(self, source, face_found):
+        """Hasil detection untuk frame yang lolos; frame diam tanpa wajah ditolak gate motion"""
+        with self._lock:
+            previous = self._previous.get(source)
+            if previous is not None:
+                self._previous[source] = (previous[0], face_found)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'frames': self._frames,
+                'passed': self._passed,
+                'gates': {gate: dict(counts) for gate, counts in self._stats.items()},
+                'avg_ms': round(self._seconds / self._frames * 1000, 3) if self._frames else 0.0
+            }
+
+    def _check(self, source, image):
+        gray = self._grayscale(image)
+
+        if self._motion_threshold:
+            rejection = self._check_motion(source, gray)
+            if rejection is not None:
+                return rejection
+
+        if self._min_brightness or self._max_brightness or self._min_contrast:
+            self._count('exposure')
+            mean, std = cv2.meanStdDev(gray)
+            brightness, contrast = mean[0][0], std[0][0]
+            if self._min_brightness and brightness < self._min_brightness:
+                return self._reject('exposure', 'too_dark', brightness)
+            if self._max_brightness and brightness > self._max_brightness:
+                return self._reject('exposure', 'too_bright', brightness)
+            if self._min_contrast and contrast < self._min_contrast:
+                return self._reject('exposure', 'low_contrast', contrast)
+
+        if self._min_sharpness:
+            self._count('sharpness')
+            sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+            if sharpness < self._min_sharpness:
+                return self._reject('sharpness', 'blurry', sharpness)
+
+        if self._detector:
+            self._count('detector')
+            faces = self._cascade().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=3, minSize=(24, 24))
+            if len(faces) == 0:
+                return self._reject('detector', 'no_face', 0)
+
+        return None
+
+    def _check_motion(self, source, gray):
+        with self._lock:
+            self._stats['motion']['checked'] += 1
+            previous = self._previous.pop(source, None)
+            # Insert ulang supaya urutan dict = urutan kamera terakhir aktif
+            self._previous[source] = (gray, previous[1] if previous else False)
+            if len(self._previous) > self._max_sources:
+                del self._previous[next(iter(self._previous))]
+
+        if previous is None or previous[1] or previous[0].shape != gray.shape:
+            return None
+        delta = cv2.absdiff(previous[0], gray).mean()
+        if delta < self._motion_threshold:
+            return self._reject('motion', 'no_motion', delta)
+        return None
+
+    def _grayscale(self, image):
+        height, width = image.shape[:2]
+        scale = self._work_size / max(height, width)
+        if scale < 1.0:
+            image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+    def _cascade(self):
+        # CascadeClassifier tidak thread-safe, satu instance per thread
+        cascade = getattr(self._local, 'cascade', None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+            self._local.cascade = cascade
+        return cascade
+
+    def _count(self, gate):
+        with self._lock:
+            self._stats[gate]['checked'] += 1
+
+    def _reject(self, gate, reason, value):
+        with self._lock:
+            self._stats[gate]['rejected'] += 1
+        return GateRejection(gate, reason, value)
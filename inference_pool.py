@@ -0,0 +1,111 @@
+import multiprocessing
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+import face_engine
+
+
+class InferencePool:
+    """
+    Pool proses untuk dlib inference (HOG detection + encoding).
+
+    Setiap worker load model dlib dan warm-up sekali saat start. Image yang sudah
+    di-decode dikirim lewat shared memory (hanya nama block, shape dan
+    dtype yang di-pickle), sehingga throughput bisa scale ke beberapa core
+    tanpa rebutan GIL di thread Flask.
+
+    Worker di-fork (context fork) saat pool dibuat, jadi pool dibuat di awal
+    import sebelum Firebase listener, log writer dan thread server lain start.
+    Process tidak sepenuhnya single-threaded saat itu: numpy dan cv2 sudah
+    di-import (thread pool BLAS punya handler fork sendiri), dan worker hanya
+    memakai face_engine. Fork-nya cepat; load model dan warm-up jalan di
+    worker tanpa menahan import, wait_ready() menunggu sampai semua selesai.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        # Worker berbagi resource tracker dengan parent, jadi attach di worker
+        # tidak membuat tracker baru yang ikut unlink shared memory saat exit
+        resource_tracker.ensure_running()
+        context = multiprocessing.get_context('fork')
+        # Setiap ping menunggu di barrier, jadi semua ping selesai hanya kalau
+        # setiap worker sudah warm-up dan memegang satu ping
+        barrier = context.Barrier(workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(barrier,)
+        )
+        # Submit pertama mem-fork semua worker sekarang di thread ini (tanpa menunggu warm-up)
+        self._warm_up = [self._executor.submit(_ping) for _ in range(workers)]
+
+    def wait_ready(self):
+        """Tunggu sampai semua worker selesai load model dan warm-up"""
+        for future in self._warm_up:
+            future.result()
+
+    def encode(self, image):
+        """Sama seperti face_engine.get_face_encoding, tapi dijalankan di worker"""
+        return self.encode_many([image])[0]
+
+    def encode_many(self, images):
+        """Encode beberapa image secara paralel, return list (encoding, error)"""
+        blocks = []
+        try:
+            futures = []
+            for image in images:
+                block = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+                blocks.append(block)
+                np.ndarray(image.shape, dtype=image.dtype, buffer=block.buf)[...] = image
+                futures.append(self._executor.submit(
+                    _encode_shared, block.name, image.shape, image.dtype.str
+                ))
+            results = []
+            for future in futures:
+                result, timings = future.result()
+                # Timing stage dari worker diteruskan ke observer di parent
+                if face_engine.stage_observer is not None:
+                    for stage, seconds in timings:
+                        face_engine.stage_observer(stage, seconds)
+                results.append(result)
+            return results
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_warm_up_barrier = None
+
+
+def _init_worker(barrier):
+    global _warm_up_barrier
+    # Ctrl+C ditangani parent, worker cukup di-terminate
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _warm_up_barrier = barrier
+    face_engine.warm_up()
+
+
+def _ping():
+    _warm_up_barrier.wait()
+    return True
+
+
+def _encode_shared(name, shape, dtype):
+    block = shared_memory.SharedMemory(name=name)
+    timings = []
+    face_engine.stage_observer = lambda stage, seconds: timings.append((stage, seconds))
+    try:
+        image = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        result = face_engine.get_face_encoding(image)
+        del image
+        return result, timings
+    finally:
+        block.close()
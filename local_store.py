@@ -0,0 +1,532 @@
+import copy
+import json
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from access_log import generate_push_id
+
+# Kolom tambahan per node: nama kolom -> fungsi ambil nilai dari record
+_COLUMNS = {
+    'users': {
+        'status': lambda store, data: data.get('status'),
+    },
+    'access_logs': {
+        'timestamp': lambda store, data: data.get('timestamp'),
+        'user_id': lambda store, data: data.get('user_id'),
+        # Log tanpa field method berasal dari face recognition
+        'method': lambda store, data: data.get('method', 'face'),
+        'authorized': lambda store, data: int(bool(data.get('authorized'))),
+    },
+}
+
+# Index per node (key ikut di index timestamp supaya urutan log stabil untuk cursor)
+_INDEXES = {
+    'users': [('status',)],
+    'access_logs': [('timestamp', 'key'), ('user_id', 'timestamp'), ('method', 'timestamp'),
+                    ('authorized', 'timestamp')],
+}
+
+_NODE_NAME = re.compile(r'^[A-Za-z0-9_]+$')
+
+# Table penanda node yang sudah di-import dari Firebase (nama di luar _NODE_NAME,
+# jadi tidak bisa bentrok dengan node)
+_BOOTSTRAP_TABLE = 'bootstrapped-nodes'
+
+
+def _segments(path):
+    return [s for s in str(path).split('/') if s]
+
+
+class StoreEvent:
+    """Event dengan bentuk yang sama seperti firebase_admin.db.Event"""
+
+    def __init__(self, event_type, path, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class _Listener:
+    def __init__(self, store, node, callback):
+        self._store = store
+        self.node = node
+        self.callback = callback
+
+    def close(self):
+        self._store._remove_listener(self)
+
+
+class LocalStore:
+    """
+    Datastore lokal berbasis SQLite (WAL mode) dengan API reference yang sama
+    seperti subset firebase_admin.db yang dipakai server.
+
+    Setiap top-level node (users, access_logs, pins, ...) adalah satu table
+    (key, data JSON) dengan kolom tambahan yang di-index: status untuk users
+    dan timestamp untuk access_logs. Semua write juga
+    dicatat ke table outbox, yang dikirim ke Firebase oleh FirebaseReplicator.
+
+    Kolom timestamp, user_id, method dan authorized di access_logs dipakai
+    query_logs() untuk filter dan cursor pagination lewat index.
+    """
+
+    def __init__(self, path, pool_size=8):
+        self._path = path
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._write_lock = threading.Lock()
+        self._listeners = []
+        self._listeners_lock = threading.Lock()
+        self._tables = set()
+
+        with self._connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS outbox '
+                '(seq INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL, data TEXT)'
+            )
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{_BOOTSTRAP_TABLE}" (node TEXT PRIMARY KEY)')
+            for node in _COLUMNS:
+                self._ensure_table(conn, node)
+
+    def reference(self, path='/'):
+        return LocalReference(self, path)
+
+    def query_logs(self, limit=50, before=None, after=None, user_id=None, method=None,
+                   authorized=None, since=None, until=None):
+        """
+        Query access logs lewat index, urut terbaru dulu.
+
+        before/after adalah log_id (cursor): ambil log yang lebih lama dari
+        before atau lebih baru dari after. since/until membatasi timestamp
+        (ISO string). Return (list of (log_id, log_data), has_more).
+        """
+        where, params = [], []
+        for column, value in (('user_id', user_id), ('method', method)):
+            if value is not None:
+                where.append(f'{column} = ?')
+                params.append(value)
+        if authorized is not None:
+            where.append('authorized = ?')
+            params.append(int(bool(authorized)))
+        if since is not None:
+            where.append('timestamp >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('timestamp <= ?')
+            params.append(until)
+
+        with self._connection() as conn:
+            ascending = False
+            for cursor, op in ((before, '<'), (after, '>')):
+                if cursor is None:
+                    continue
+                row = conn.execute('SELECT timestamp FROM "access_logs" WHERE key = ?', (cursor,)).fetchone()
+                if row is None:
+                    raise KeyError(cursor)
+                where.append(f'(timestamp {op} ? OR (timestamp = ? AND key {op} ?))')
+                params.extend([row[0], row[0], cursor])
+                ascending = ascending or op == '>'
+
+            # Dengan after, ambil yang paling dekat ke cursor dulu lalu dibalik
+            order = 'ASC' if ascending and before is None else 'DESC'
+            sql = 'SELECT key, data FROM "access_logs"'
+            if where:
+                sql += ' WHERE ' + ' AND '.join(where)
+            sql += f' ORDER BY timestamp {order}, key {order} LIMIT ?'
+            rows = conn.execute(sql, params + [limit + 1]).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if order == 'ASC':
+            rows.reverse()
+        return [(key, json.loads(data)) for key, data in rows], has_more
+
+    def is_bootstrapped(self, node):
+        with self._connection() as conn:
+            query = f'SELECT 1 FROM "{_BOOTSTRAP_TABLE}" WHERE node = ?'
+            return conn.execute(query, (node,)).fetchone() is not None
+
+    def import_node(self, node, data):
+        """
+        Gabungkan snapshot node (misalnya dari Firebase) ke store lokal tanpa
+        masuk outbox, lalu tandai node sudah di-bootstrap. Record yang sudah
+        ada di lokal atau masih punya perubahan di outbox (ditulis sebelum
+        bootstrap) tidak ditimpa. Return jumlah record yang di-import.
+        """
+        events = []
+        with self._write_lock, self._connection() as conn:
+            try:
+                self._ensure_table(conn, node)
+                skip = {key for (key,) in conn.execute(f'SELECT key FROM "{node}"')}
+                rows = conn.execute(
+                    'SELECT path FROM outbox WHERE path = ? OR substr(path, 1, ?) = ?',
+                    (node, len(node) + 1, node + '/')
+                )
+                replaced = False
+                for (path,) in rows:
+                    segments = _segments(path)
+                    if len(segments) == 1:
+                        # Node di-set/dihapus seluruhnya secara lokal (misalnya clear logs)
+                        replaced = True
+                    else:
+                        skip.add(segments[1])
+
+                if not replaced:
+                    for key, record in (data or {}).items():
+                        if key not in skip:
+                            self._put_record(conn, node, key, record)
+                            events.append((key, record))
+                conn.execute(f'INSERT OR IGNORE INTO "{_BOOTSTRAP_TABLE}" (node) VALUES (?)', (node,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        for key, record in events:
+            self._notify(node, f'/{key}', record)
+        return len(events)
+
+    # -- Outbox (dipakai FirebaseReplicator) --
+
+    def pending_changes(self, limit=500):
+        """Return list (seq, path, value) dari outbox, urut sesuai waktu write"""
+        with self._connection() as conn:
+            rows = conn.execute('SELECT seq, path, data FROM outbox ORDER BY seq LIMIT ?', (limit,)).fetchall()
+        return [(seq, path, json.loads(data) if data is not None else None) for seq, path, data in rows]
+
+    def ack_changes(self, last_seq):
+        with self._write_lock, self._connection() as conn:
+            conn.execute('DELETE FROM outbox WHERE seq <= ?', (last_seq,))
+            conn.commit()
+
+    def outbox_depth(self):
+        with self._connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    # -- Internal --
+
+    @contextmanager
+    def _connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(self._path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA synchronous=NORMAL')
+        try:
+            yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def _ensure_table(self, conn, node):
+        if node in self._tables:
+            return
+        if not _NODE_NAME.match(node):
+            raise ValueError(f"Invalid node name: {node}")
+
+        columns = _COLUMNS.get(node, {})
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{node}" (key TEXT PRIMARY KEY, data TEXT NOT NULL)')
+
+        # Tambah kolom yang belum ada (database dari versi lama), lalu isi dari data JSON
+        existing = {row[1] for row in conn.execute(f'PRAGMA table_info("{node}")')}
+        missing = [column for column in columns if column not in existing]
+        for column in missing:
+            conn.execute(f'ALTER TABLE "{node}" ADD COLUMN {column}')
+        if missing:
+            for key, data in conn.execute(f'SELECT key, data FROM "{node}"').fetchall():
+                record = json.loads(data)
+                if isinstance(record, dict):
+                    assignments = ', '.join(f'{column} = ?' for column in missing)
+                    values = [columns[column](self, record) for column in missing]
+                    conn.execute(f'UPDATE "{node}" SET {assignments} WHERE key = ?', values + [key])
+
+        for index in _INDEXES.get(node, []):
+            name = f'idx_{node}_' + '_'.join(index)
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{node}" ({", ".join(index)})')
+        conn.commit()
+        self._tables.add(node)
+
+    def _nodes(self, conn):
+        rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        return [name for (name,) in rows
+                if name not in ('outbox', _BOOTSTRAP_TABLE) and not name.startswith('sqlite_')]
+
+    def _read(self, segments, order_by=None, limit_last=None):
+        with self._connection() as conn:
+            if not segments:
+                result = {node: self._read_node(conn, node) for node in self._nodes(conn)}
+                return {node: data for node, data in result.items() if data} or None
+
+            node = segments[0]
+            self._ensure_table(conn, node)
+            if len(segments) == 1:
+                return self._read_node(conn, node, order_by, limit_last) or None
+
+            row = conn.execute(f'SELECT data FROM "{node}" WHERE key = ?', (segments[1],)).fetchone()
+        if row is None:
+            return None
+        value = json.loads(row[0])
+        for part in segments[2:]:
+            if not isinstance(value, dict) or part not in value:
+                return None
+            value = value[part]
+        return value
+
+    def _read_node(self, conn, node, order_by=None, limit_last=None):
+        if order_by is not None and order_by in _COLUMNS.get(node, {}):
+            # Query lewat index, ambil N terakhir lalu balik ke urutan ascending
+            sql = f'SELECT key, data FROM "{node}" ORDER BY {order_by} DESC, key DESC'
+            if limit_last:
+                sql += f' LIMIT {int(limit_last)}'
+            rows = conn.execute(sql).fetchall()[::-1]
+            return {key: json.loads(data) for key, data in rows}
+
+        items = [(key, json.loads(data)) for key, data in conn.execute(f'SELECT key, data FROM "{node}" ORDER BY key')]
+        if order_by is not None:
+            items.sort(key=lambda item: (item[1].get(order_by) is not None, str(item[1].get(order_by, ''))))
+            if limit_last:
+                items = items[-limit_last:]
+        return dict(items)
+
+    def _write(self, writes, replicate=True):
+        """
+        Apply list (segments, value) dalam satu transaction. value None = delete.
+        Listener dipanggil setelah commit.
+        """
+        events = []
+        with self._write_lock, self._connection() as conn:
+            try:
+                for segments, value in writes:
+                    if not segments:
+                        raise ValueError('Writing to the database root is not supported')
+                    self._ensure_table(conn, segments[0])
+                    self._write_one(conn, segments, value)
+                    if replicate:
+                        conn.execute(
+                            'INSERT INTO outbox (path, data) VALUES (?, ?)',
+                            ('/'.join(segments), json.dumps(value) if value is not None else None)
+                        )
+                    events.append((segments, value))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        for segments, value in events:
+            self._notify(segments[0], '/' + '/'.join(segments[1:]), value)
+
+    def _write_one(self, conn, segments, value):
+        node = segments[0]
+        if len(segments) == 1:
+            conn.execute(f'DELETE FROM "{node}"')
+            for key, record in (value or {}).items():
+                self._put_record(conn, node, key, record)
+            return
+
+        key = segments[1]
+        if len(segments) > 2:
+            # Write ke field di dalam record: read-modify-write
+            row = conn.execute(f'SELECT data FROM "{node}" WHERE key = ?', (key,)).fetchone()
+            record = json.loads(row[0]) if row else {}
+            parent = record
+            for part in segments[2:-1]:
+                if not isinstance(parent.get(part), dict):
+                    parent[part] = {}
+                parent = parent[part]
+            if value is None:
+                parent.pop(segments[-1], None)
+            else:
+                parent[segments[-1]] = copy.deepcopy(value)
+            value = record or None
+
+        if value is None:
+            conn.execute(f'DELETE FROM "{node}" WHERE key = ?', (key,))
+        else:
+            self._put_record(conn, node, key, value)
+
+    def _put_record(self, conn, node, key, record):
+        columns = _COLUMNS.get(node)
+        data = json.dumps(record)
+        if columns and isinstance(record, dict):
+            names = ', '.join(columns)
+            placeholders = ', '.join('?' * len(columns))
+            conn.execute(
+                f'INSERT OR REPLACE INTO "{node}" (key, data, {names}) VALUES (?, ?, {placeholders})',
+                [key, data] + [extract(self, record) for extract in columns.values()]
+            )
+        else:
+            conn.execute(f'INSERT OR REPLACE INTO "{node}" (key, data) VALUES (?, ?)', (key, data))
+
+    def _notify(self, node, path, value):
+        with self._listeners_lock:
+            listeners = [listener for listener in self._listeners if listener.node == node]
+        for listener in listeners:
+            try:
+                listener.callback(StoreEvent('put', path, copy.deepcopy(value)))
+            except Exception as e:
+                print(f"Error in local store listener: {e}")
+
+    def _add_listener(self, node, callback):
+        listener = _Listener(self, node, callback)
+        with self._listeners_lock:
+            self._listeners.append(listener)
+        return listener
+
+    def _remove_listener(self, listener):
+        with self._listeners_lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+
+class LocalReference:
+    """Pengganti firebase_admin.db.Reference yang membaca/menulis LocalStore"""
+
+    def __init__(self, store, path, order_by=None, limit_last=None):
+        self._store = store
+        self.path = '/' + '/'.join(_segments(path))
+        self._order_by = order_by
+        self._limit_last = limit_last
+
+    @property
+    def key(self):
+        segments = _segments(self.path)
+        return segments[-1] if segments else None
+
+    def child(self, path):
+        return LocalReference(self._store, f"{self.path}/{path}")
+
+    def order_by_child(self, path):
+        return LocalReference(self._store, self.path, path, self._limit_last)
+
+    def limit_to_last(self, limit):
+        return LocalReference(self._store, self.path, self._order_by, limit)
+
+    def get(self):
+        return self._store._read(_segments(self.path), self._order_by, self._limit_last)
+
+    def set(self, value):
+        self._store._write([(_segments(self.path), value)])
+
+    def update(self, value):
+        base = _segments(self.path)
+        self._store._write([(base + _segments(path), child_value) for path, child_value in value.items()])
+
+    def delete(self):
+        self.set(None)
+
+    def push(self, value=''):
+        ref = self.child(generate_push_id())
+        ref.set(value)
+        return ref
+
+    def listen(self, callback):
+        """Listener untuk write lokal ke node ini (event 'put' per path yang berubah)"""
+        segments = _segments(self.path)
+        if len(segments) != 1:
+            raise ValueError('Local listeners are only supported on top-level nodes')
+        return self._store._add_listener(segments[0], callback)
+
+
+class FirebaseReplicator:
+    """
+    Background thread yang mengirim perubahan dari outbox LocalStore ke
+    Firebase RTDB sebagai multi-path update, sesuai urutan write. Kalau
+    Firebase tidak bisa dihubungi, perubahan tetap di outbox dan dicoba lagi
+    setelah retry_interval, jadi server tetap jalan offline.
+    """
+
+    def __init__(self, store, root_ref, interval=1.0, batch_size=500, retry_interval=10.0):
+        self._store = store
+        self._root = root_ref
+        self._interval = interval
+        self._batch_size = batch_size
+        self._retry_interval = retry_interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'replicated': 0, 'failed_syncs': 0, 'last_sync': None, 'last_error': None}
+
+    def bootstrap(self, nodes):
+        """
+        Import node dari Firebase yang belum pernah di-bootstrap ke store lokal
+        (digabung dengan record yang sudah ditulis lokal sebelumnya, lihat
+        LocalStore.import_node). Node yang gagal di-fetch dicoba lagi saat
+        start berikutnya. Return list node yang mendapat record baru.
+        """
+        imported = []
+        for node in nodes:
+            if self._store.is_bootstrapped(node):
+                continue
+            try:
+                data = self._root.child(node).get()
+            except Exception as e:
+                print(f"Could not bootstrap '{node}' from Firebase, will retry on next start: {e}")
+                continue
+            count = self._store.import_node(node, data)
+            if count:
+                print(f"Imported {count} records into local '{node}' from Firebase")
+                imported.append(node)
+        return imported
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {**self._stats, 'outbox_depth': self._store.outbox_depth()}
+
+    def sync_once(self):
+        """Kirim satu batch outbox, return jumlah perubahan yang terkirim"""
+        changes = self._store.pending_changes(self._batch_size)
+        if not changes:
+            return 0
+
+        for update in self._multi_path_updates(changes):
+            self._root.update(update)
+        self._store.ack_changes(changes[-1][0])
+        self._stats['replicated'] += len(changes)
+        self._stats['last_sync'] = time.time()
+        return len(changes)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.sync_once() >= self._batch_size:
+                    continue
+                wait = self._interval
+            except Exception as e:
+                self._stats['failed_syncs'] += 1
+                self._stats['last_error'] = str(e)
+                wait = self._retry_interval
+            self._stop.wait(wait)
+
+    @staticmethod
+    def _multi_path_updates(changes):
+        """
+        Gabungkan perubahan jadi sesedikit mungkin multi-path update. Firebase
+        menolak update yang berisi path dan ancestor-nya sekaligus, jadi batch
+        dipecah setiap kali ada path yang overlap (urutan write tetap terjaga).
+        """
+        updates = [{}]
+        for _, path, value in changes:
+            current = updates[-1]
+            overlap = any(
+                other != path and (other.startswith(path + '/') or path.startswith(other + '/'))
+                for other in current
+            )
+            if overlap:
+                current = {}
+                updates.append(current)
+            current.pop(path, None)
+            current[path] = value
+        return updates
@@ -0,0 +1,193 @@
+import gzip
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+
+def _log_day(log_data):
+    return str(log_data.get('timestamp', ''))[:10] or 'unknown'
+
+
+def _sort_key(item):
+    log_id, log_data = item
+    return (log_data.get('timestamp', ''), log_id)
+
+
+class LogArchive:
+    """
+    Arsip access log lama di disk, dipartisi per hari:
+    <archive_dir>/<YYYY-MM>/<YYYY-MM-DD>.jsonl.gz
+
+    Setiap partisi adalah gzip JSONL ({"log_id": ..., "data": {...}} per
+    baris) yang diurutkan berdasarkan (timestamp, log_id). Partisi yang sudah
+    ada di-merge dan ditulis ulang secara atomic, jadi arsip ulang log yang
+    sama (misalnya setelah crash di tengah retention run) tidak membuat
+    duplikat.
+    """
+
+    def __init__(self, archive_dir):
+        self._dir = archive_dir
+        self._lock = threading.Lock()
+
+    def days(self):
+        """List partisi (YYYY-MM-DD) yang ada, urut ascending"""
+        if not os.path.isdir(self._dir):
+            return []
+        days = []
+        for month in os.listdir(self._dir):
+            month_dir = os.path.join(self._dir, month)
+            if os.path.isdir(month_dir):
+                days.extend(name[:-len('.jsonl.gz')] for name in os.listdir(month_dir)
+                            if name.endswith('.jsonl.gz'))
+        return sorted(days)
+
+    def read_day(self, day):
+        """Return list (log_id, log_data) dalam satu partisi, urut ascending"""
+        path = self._path(day)
+        if not os.path.exists(path):
+            return []
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        return [(entry['log_id'], entry['data']) for entry in entries]
+
+    def add(self, logs):
+        """Arsipkan list (log_id, log_data), return jumlah log yang baru masuk arsip"""
+        by_day = {}
+        for log_id, log_data in logs:
+            by_day.setdefault(_log_day(log_data), {})[log_id] = log_data
+
+        added = 0
+        with self._lock:
+            for day, entries in by_day.items():
+                existing = dict(self.read_day(day))
+                added += sum(1 for log_id in entries if log_id not in existing)
+                existing.update(entries)
+                self._write_day(day, sorted(existing.items(), key=_sort_key))
+        return added
+
+    def iter_logs(self):
+        """Iterasi semua log di arsip (log_id, log_data), dari yang paling lama"""
+        for day in self.days():
+            yield from self.read_day(day)
+
+    def query(self, limit=50, before=None, user_id=None, method=None, authorized=None,
+              since=None, until=None):
+        """
+        Query arsip, urut terbaru dulu, dengan filter yang sama seperti
+        LocalStore.query_logs. Hanya partisi di dalam range since/until yang
+        dibuka. before adalah log_id (cursor) dari halaman sebelumnya.
+        Return (list of (log_id, log_data), has_more).
+        """
+        found = before is None
+        selected = []
+        for day in reversed(self.days()):
+            if since is not None and day < since[:10]:
+                break
+            if until is not None and day > until[:10]:
+                continue
+
+            for log_id, log_data in reversed(self.read_day(day)):
+                if not found:
+                    found = log_id == before
+                    continue
+                timestamp = log_data.get('timestamp', '')
+                if ((user_id is None or log_data.get('user_id') == user_id)
+                        and (method is None or log_data.get('method', 'face') == method)
+                        and (authorized is None or bool(log_data.get('authorized')) == authorized)
+                        and (since is None or timestamp >= since)
+                        and (until is None or timestamp <= until)):
+                    selected.append((log_id, log_data))
+                    if len(selected) > limit:
+                        return selected[:limit], True
+
+        if not found:
+            raise KeyError(before)
+        return selected, False
+
+    def stats(self):
+        days = self.days()
+        size = sum(os.path.getsize(self._path(day)) for day in days)
+        return {
+            'partitions': len(days),
+            'oldest': days[0] if days else None,
+            'newest': days[-1] if days else None,
+            'bytes': size
+        }
+
+    def _path(self, day):
+        return os.path.join(self._dir, day[:7], f"{day}.jsonl.gz")
+
+    def _write_day(self, day, items):
+        path = self._path(day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            for log_id, log_data in items:
+                f.write(json.dumps({'log_id': log_id, 'data': log_data}) + '\n')
+        os.replace(tmp_path, path)
+
+
+class LogRetention:
+    """
+    Background job yang memindahkan access log lebih lama dari retention_days
+    dari storage utama ke LogArchive, supaya node access_logs tetap kecil.
+
+    fetch_expired(cutoff, limit) harus return list (log_id, log_data) dengan
+    timestamp sebelum cutoff (tanggal ISO). Log dihapus dari storage utama
+    setelah partisi arsipnya berhasil ditulis.
+    """
+
+    def __init__(self, logs_ref, archive, fetch_expired, retention_days, interval=3600.0,
+                 batch_size=500):
+        self._ref = logs_ref
+        self._archive = archive
+        self._fetch_expired = fetch_expired
+        self._retention_days = retention_days
+        self._interval = interval
+        self._batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'runs': 0, 'archived': 0, 'last_run': None, 'last_error': None}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        return {'retention_days': self._retention_days, **self._stats, 'archive': self._archive.stats()}
+
+    def run_once(self):
+        """Arsipkan semua log yang sudah lewat retention, return jumlahnya"""
+        cutoff = (datetime.now() - timedelta(days=self._retention_days)).date().isoformat()
+        moved = 0
+        while not self._stop.is_set():
+            batch = self._fetch_expired(cutoff, self._batch_size)
+            if not batch:
+                break
+            self._archive.add(batch)
+            self._ref.update({log_id: None for log_id, _ in batch})
+            moved += len(batch)
+
+        self._stats['runs'] += 1
+        self._stats['archived'] += moved
+        self._stats['last_run'] = datetime.now().isoformat()
+        return moved
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                moved = self.run_once()
+                self._stats['last_error'] = None
+                if moved:
+                    print(f"Archived {moved} access logs older than {self._retention_days} days")
+            except Exception as e:
+                print(f"Error archiving access logs: {e}")
+                self._stats['last_error'] = str(e)
+            self._stop.wait(self._interval)
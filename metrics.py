@@ -0,0 +1,204 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Bucket default (detik) untuk latency histogram, dari 1 ms sampai 10 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_request_timings = threading.local()
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Gauge:
+    """Gauge yang nilainya diambil dari callback saat scrape"""
+
+    def __init__(self, name, help_text, callback):
+        self.name = name
+        self.help = help_text
+        self._callback = callback
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self._callback()
+        except Exception:
+            return lines
+        if isinstance(value, dict):
+            for labels, item in value.items():
+                lines.append(f"{self.name}{_format_labels(labels)} {item}")
+        elif value is not None:
+            lines.append(f"{self.name} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self._buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self._buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in self._series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self._buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, {'le': bound})} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text):
+        return self._add(Counter(name, help_text))
+
+    def gauge(self, name, help_text, callback):
+        return self._add(Gauge(name, help_text, callback))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+stage_duration = registry.histogram(
+    'face_server_stage_duration_seconds', 'Durasi per stage pipeline'
+)
+firebase_duration = registry.histogram(
+    'face_server_firebase_call_duration_seconds', 'Durasi panggilan Firebase RTDB'
+)
+firebase_errors = registry.counter(
+    'face_server_firebase_errors_total', 'Panggilan Firebase RTDB yang gagal'
+)
+
+
+def start_request_timings():
+    """Mulai kumpulkan timing stage untuk request di thread ini (Server-Timing)"""
+    _request_timings.items = []
+
+
+def request_timings():
+    return getattr(_request_timings, 'items', None) or []
+
+
+def observe_stage(stage, seconds):
+    stage_duration.observe(seconds, stage=stage)
+    items = getattr(_request_timings, 'items', None)
+    if items is not None:
+        items.append((stage, seconds))
+
+
+@contextmanager
+def stage_timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def server_timing_header(timings):
+    """Format list (stage, seconds) sebagai header Server-Timing"""
+    return ', '.join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings)
+
+
+class InstrumentedReference:
+    """
+    Proxy untuk firebase_admin.db.Reference yang mencatat latency dan error
+    setiap panggilan get/set/update/push/delete, dengan label node dan operasi.
+    """
+
+    _TIMED = ('get', 'set', 'update', 'push', 'delete')
+
+    def __init__(self, ref, node=None):
+        self._ref = ref
+        self._node = node or ref.path.strip('/').split('/')[0] or 'root'
+
+    def __getattr__(self, name):
+        attr = getattr(self._ref, name)
+        if name in self._TIMED:
+            return self._timed(name, attr)
+        return attr
+
+    def child(self, path):
+        return InstrumentedReference(self._ref.child(path), self._node)
+
+    def order_by_child(self, path):
+        return InstrumentedReference(self._ref.order_by_child(path), self._node)
+
+    def limit_to_last(self, limit):
+        return InstrumentedReference(self._ref.limit_to_last(limit), self._node)
+
+    def _timed(self, operation, fn):
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                firebase_errors.inc(node=self._node, operation=operation)
+                raise
+            finally:
+                firebase_duration.observe(time.perf_counter() - start, node=self._node, operation=operation)
+        return call
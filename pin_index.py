@@ -0,0 +1,162 @@
+import hashlib
+import hmac
+import os
+import threading
+
+
+class PinIndex:
+    """
+    Index in-memory untuk node `pins` di Firebase RTDB.
+
+    PIN disimpan sebagai HMAC-SHA256 dengan key random per proses (salt),
+    jadi verifikasi dan cek duplikat cukup satu dict lookup tanpa round trip
+    ke Firebase, dan plaintext PIN tidak ikut tersimpan di memory proses.
+
+    Sama seperti FaceGallery, index di-load sekali saat startup lalu di-update
+    lewat listener RTDB dan lewat upsert/remove dari endpoint, dengan full
+    reload berkala sebagai safety net.
+    """
+
+    def __init__(self, pins_ref, refresh_interval=300):
+        self._ref = pins_ref
+        self._refresh_interval = refresh_interval
+        self._key = os.urandom(32)
+        self._lock = threading.RLock()
+        # digest -> {pin_id: {'user_name', 'status', ...}}
+        self._by_digest = {}
+        # pin_id -> digest
+        self._digests = {}
+        self._listener = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Initial load, lalu pasang listener dan refresh thread"""
+        self.load()
+
+        try:
+            self._listener = self._ref.listen(self._on_event)
+        except Exception as e:
+            print(f"PIN listener unavailable, using periodic refresh only: {e}")
+
+        if self._refresh_interval:
+            thread = threading.Thread(target=self._refresh_loop, daemon=True)
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def load(self):
+        """Full reload dari Firebase"""
+        pins = self._ref.get() or {}
+        with self._lock:
+            self._by_digest = {}
+            self._digests = {}
+            for pin_id, pin_data in pins.items():
+                self._set_pin(pin_id, pin_data)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._digests)
+
+    def digest(self, pin):
+        """HMAC dari PIN, None untuk PIN yang bukan string (misalnya integer dari JSON)"""
+        if not isinstance(pin, str):
+            return None
+        return hmac.new(self._key, pin.encode(), hashlib.sha256).digest()
+
+    def verify(self, pin):
+        """Return (pin_id, entry) untuk PIN active yang cocok, atau None"""
+        if not isinstance(pin, str):
+            return None
+        with self._lock:
+            for pin_id, entry in self._by_digest.get(self.digest(pin), {}).items():
+                if entry.get('status') == 'active':
+                    return pin_id, dict(entry)
+        return None
+
+    def find(self, pin):
+        """Return (pin_id, entry) untuk PIN yang sudah terdaftar (status apa pun), atau None"""
+        if not isinstance(pin, str):
+            return None
+        with self._lock:
+            for pin_id, entry in self._by_digest.get(self.digest(pin), {}).items():
+                return pin_id, dict(entry)
+        return None
+
+    def upsert(self, pin_id, pin_data):
+        """Update index setelah PIN dibuat/diubah (pin_data None = hapus)"""
+        with self._lock:
+            self._set_pin(pin_id, pin_data)
+
+    def remove(self, pin_id):
+        self.upsert(pin_id, None)
+
+    def _set_pin(self, pin_id, pin_data):
+        self._drop_pin(pin_id)
+        if not isinstance(pin_data, dict) or not isinstance(pin_data.get('pin'), str) or not pin_data['pin']:
+            return
+
+        digest = self.digest(pin_data['pin'])
+        entry = {key: value for key, value in pin_data.items() if key != 'pin'}
+        self._by_digest.setdefault(digest, {})[pin_id] = entry
+        self._digests[pin_id] = digest
+
+    def _drop_pin(self, pin_id):
+        digest = self._digests.pop(pin_id, None)
+        if digest is None:
+            return
+        entries = self._by_digest.get(digest, {})
+        entries.pop(pin_id, None)
+        if not entries:
+            self._by_digest.pop(digest, None)
+
+    def _on_event(self, event):
+        """Apply event put/patch dari RTDB listener ke index"""
+        try:
+            if event.event_type == 'patch':
+                for key, value in (event.data or {}).items():
+                    self._apply(f"{event.path.rstrip('/')}/{key}", value)
+            else:
+                self._apply(event.path, event.data)
+        except Exception as e:
+            print(f"Error applying PIN event: {e}")
+
+    def _apply(self, path, data):
+        segments = [s for s in path.split('/') if s]
+
+        if not segments:
+            with self._lock:
+                self._by_digest = {}
+                self._digests = {}
+                for pin_id, pin_data in (data or {}).items():
+                    self._set_pin(pin_id, pin_data)
+            return
+
+        pin_id = segments[0]
+        if len(segments) == 1:
+            self.upsert(pin_id, data)
+            return
+
+        with self._lock:
+            digest = self._digests.get(pin_id)
+            if len(segments) == 2 and segments[1] != 'pin' and digest is not None:
+                # Perubahan field metadata (status, user_name, ...)
+                entry = self._by_digest[digest][pin_id]
+                if data is None:
+                    entry.pop(segments[1], None)
+                else:
+                    entry[segments[1]] = data
+                return
+
+        # PIN berubah atau record belum dikenal, ambil ulang record tersebut
+        self.upsert(pin_id, self._ref.child(pin_id).get())
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self._refresh_interval):
+            try:
+                self.load()
+            except Exception as e:
+                print(f"Error refreshing PIN index: {e}")
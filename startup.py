@@ -0,0 +1,76 @@
+import threading
+import time
+
+
+class Startup:
+    """
+    Tahap startup server yang dijalankan di background thread setelah module
+    di-import, supaya HTTP server bisa langsung live (liveness) sementara
+    model di-load dan di-warm-up. ready baru di-set setelah semua step
+    selesai (readiness). Durasi setiap step dicatat untuk /api/health/ready.
+
+    Step dengan wait_ready=False (misalnya bootstrap Firebase yang bisa lama
+    saat offline) dijalankan setelah ready, jadi readiness tidak menunggunya.
+
+    Step yang gagal dicatat error-nya; server tetap ready karena fitur lain
+    (PIN, logs, user management) tidak bergantung pada step tersebut.
+    """
+
+    def __init__(self, started_at):
+        # started_at: time.perf_counter() saat process mulai import
+        self._started_at = started_at
+        self._steps = []
+        self._timings = []
+        self._ready = threading.Event()
+        self._ready_after = None
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def record(self, name, seconds):
+        """Catat step yang sudah dijalankan secara synchronous saat import"""
+        self._timings.append({'step': name, 'seconds': round(seconds, 3), 'error': None})
+
+    def add(self, name, fn, wait_ready=True):
+        self._steps.append((name, fn, wait_ready))
+
+    def start(self):
+        self.record('import', time.perf_counter() - self._started_at)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def stats(self):
+        return {
+            'ready': self.ready,
+            'ready_after_seconds': self._ready_after,
+            'uptime_seconds': round(time.perf_counter() - self._started_at, 3),
+            'steps': list(self._timings)
+        }
+
+    def _run(self):
+        for name, fn, wait_ready in self._steps:
+            if wait_ready:
+                self._run_step(name, fn)
+
+        self._ready_after = round(time.perf_counter() - self._started_at, 3)
+        self._ready.set()
+        print(f"Server ready in {self._ready_after}s")
+
+        for name, fn, wait_ready in self._steps:
+            if not wait_ready:
+                self._run_step(name, fn)
+
+    def _run_step(self, name, fn):
+        started = time.perf_counter()
+        error = None
+        try:
+            fn()
+        except Exception as e:
+            print(f"Startup step '{name}' failed: {e}")
+            error = str(e)
+        self._timings.append({'step': name, 'seconds': round(time.perf_counter() - started, 3), 'error': error})
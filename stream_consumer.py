@@ -0,0 +1,167 @@
+import re
+import threading
+import time
+import urllib.request
+
+import cv2
+import numpy as np
+
+_CONTENT_LENGTH = re.compile(rb'content-length:\s*(\d+)', re.IGNORECASE)
+
+
+class MjpegParser:
+    """
+    Parser incremental untuk stream multipart/x-mixed-replace (MJPEG).
+
+    feed() menerima chunk bytes apa adanya dari socket dan return list JPEG
+    lengkap yang sudah terkumpul. Part dengan header Content-Length (seperti
+    stream ESP32-CAM) dipotong sesuai panjangnya; kalau tidak ada, frame
+    diakhiri marker JPEG EOI.
+    """
+
+    def __init__(self, max_frame_size=2 * 1024 * 1024):
+        self._buffer = bytearray()
+        self._max_frame_size = max_frame_size
+
+    def feed(self, data):
+        self._buffer += data
+        frames = []
+        while True:
+            frame = self._next_frame()
+            if frame is None:
+                break
+            frames.append(frame)
+
+        if len(self._buffer) > self._max_frame_size:
+            # Stream rusak atau bukan MJPEG, buang dan sinkron ulang di part berikutnya
+            self._buffer.clear()
+        return frames
+
+    def _next_frame(self):
+        buf = self._buffer
+        header_end = buf.find(b'\r\n\r\n')
+        if header_end < 0:
+            return None
+
+        start = header_end + 4
+        match = _CONTENT_LENGTH.search(buf, 0, header_end)
+        if match:
+            end = start + int(match.group(1))
+            if len(buf) < end:
+                return None
+        else:
+            eoi = buf.find(b'\xff\xd9', start)
+            if eoi < 0:
+                return None
+            end = eoi + 2
+
+        frame = bytes(buf[start:end])
+        del buf[:end]
+        return frame
+
+
+class StreamConsumer:
+    """
+    Baca MJPEG stream dari kamera (misalnya http://<esp32-cam>/stream) dan
+    jalankan handle_frame(source, image) untuk frame yang layak diproses.
+
+    Setiap frame di-decode murah dulu (grayscale 1/8 resolusi) untuk deteksi
+    motion. Frame di-decode penuh dan diproses kalau ada motion, atau setiap
+    every_n frame. Reader thread tidak pernah menunggu pipeline: frame
+    terpilih ditaruh di slot "latest" dan worker thread selalu mengambil yang
+    terbaru, sehingga frame basi dilewati. Koneksi yang putus di-reconnect.
+    """
+
+    def __init__(self, source, url, handle_frame, every_n=5, motion_threshold=6.0,
+                 reconnect_interval=2.0, timeout=10.0):
+        self.source = source
+        self._url = url
+        self._handle_frame = handle_frame
+        self._every_n = every_n
+        self._motion_threshold = motion_threshold
+        self._reconnect_interval = reconnect_interval
+        self._timeout = timeout
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+        self._latest = None
+        self._previous = None
+        self._last_result = None
+        self._stats = {'frames': 0, 'selected': 0, 'processed': 0, 'replaced': 0,
+                       'invalid': 0, 'reconnects': 0, 'connected': False}
+
+    def start(self):
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        threading.Thread(target=self._process_loop, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def stats(self):
+        return {'source': self.source, 'url': self._url, **self._stats, 'last_result': self._last_result}
+
+    def _read_loop(self):
+        while not self._stop.is_set():
+            try:
+                self._consume()
+            except Exception as e:
+                print(f"Stream {self.source} disconnected: {e}")
+            self._stats['connected'] = False
+            if self._stop.wait(self._reconnect_interval):
+                break
+            self._stats['reconnects'] += 1
+
+    def _consume(self):
+        with urllib.request.urlopen(self._url, timeout=self._timeout) as response:
+            self._stats['connected'] = True
+            parser = MjpegParser()
+            while not self._stop.is_set():
+                chunk = response.read1(64 * 1024)
+                if not chunk:
+                    return
+                for jpeg in parser.feed(chunk):
+                    self._on_frame(jpeg)
+
+    def _on_frame(self, jpeg):
+        self._stats['frames'] += 1
+        data = np.frombuffer(jpeg, dtype=np.uint8)
+        small = cv2.imdecode(data, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if small is None:
+            self._stats['invalid'] += 1
+            return
+
+        previous, self._previous = self._previous, small
+        motion = (previous is not None and previous.shape == small.shape
+                  and cv2.absdiff(previous, small).mean() > self._motion_threshold)
+        if not motion and self._stats['frames'] % self._every_n:
+            return
+
+        self._stats['selected'] += 1
+        with self._cond:
+            if self._latest is not None:
+                self._stats['replaced'] += 1
+            self._latest = data
+            self._cond.notify()
+
+    def _process_loop(self):
+        while not self._stop.is_set():
+            with self._cond:
+                while self._latest is None and not self._stop.is_set():
+                    self._cond.wait(0.5)
+                data, self._latest = self._latest, None
+            if data is None:
+                continue
+
+            image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+            if image is None:
+                self._stats['invalid'] += 1
+                continue
+            try:
+                result = self._handle_frame(self.source, image)
+            except Exception as e:
+                print(f"Error processing frame from {self.source}: {e}")
+                continue
+            self._stats['processed'] += 1
+            if result is not None:
+                self._last_result = {**result, 'timestamp': time.time()}
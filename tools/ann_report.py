@@ -0,0 +1,137 @@
+"""
+Recall/latency report untuk ANN index gallery (ann_index.IVFIndex).
+
+Bandingkan hasil IVF dengan exact flat scan untuk beberapa kombinasi
+nlist/nprobe, supaya parameter ANN_NLIST dan ANN_NPROBE bisa dipilih.
+
+Usage:
+    python tools/ann_report.py --size 20000 --nlist 64,141,256 --nprobe 1,4,8,16
+    python tools/ann_report.py --input encodings.npy --json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ann_index import IVFIndex
+
+TOLERANCE = 0.6
+
+
+def synthetic_gallery(size, seed=0):
+    """Encodings sintetis yang mirip distribusi dlib (norm ~1, antar orang ~0.8-1.0)"""
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(0, 1, (size, 128)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors *= 0.65
+    return vectors
+
+
+def probe_queries(gallery, count, noise=0.35, seed=1):
+    """Query = encoding user yang ada + noise (simulasi foto baru dari orang yang sama)"""
+    rng = np.random.default_rng(seed)
+    targets = rng.integers(len(gallery), size=count)
+    jitter = rng.normal(0, 1, (count, gallery.shape[1])).astype(np.float32)
+    jitter *= noise / np.linalg.norm(jitter, axis=1, keepdims=True)
+    return gallery[targets] + jitter
+
+
+def exact_search(gallery, sq_norms, query):
+    d = sq_norms - 2.0 * (gallery @ query) + np.dot(query, query)
+    best = int(np.argmin(d))
+    return best, float(np.sqrt(max(d[best], 0.0)))
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def run(args):
+    if args.input:
+        gallery = np.load(args.input).astype(np.float32)
+    else:
+        gallery = synthetic_gallery(args.size)
+    queries = probe_queries(gallery, args.queries)
+    keys = [f"user_{i}" for i in range(len(gallery))]
+    sq_norms = (gallery * gallery).sum(axis=1)
+
+    flat_times = []
+    truth = []
+    for query in queries:
+        start = time.perf_counter()
+        truth.append(exact_search(gallery, sq_norms, query))
+        flat_times.append(time.perf_counter() - start)
+
+    report = {
+        'gallery_size': len(gallery),
+        'queries': len(queries),
+        'flat': {'p50_ms': percentile_ms(flat_times, 50), 'p95_ms': percentile_ms(flat_times, 95)},
+        'ivf': []
+    }
+
+    for nlist in args.nlist:
+        index = IVFIndex(nlist=nlist)
+        start = time.perf_counter()
+        index.train(gallery)
+        index.add_many(keys, gallery)
+        build_s = time.perf_counter() - start
+
+        for nprobe in args.nprobe:
+            times = []
+            hits = 0
+            decisions = 0
+            for query, (best, distance) in zip(queries, truth):
+                start = time.perf_counter()
+                result = index.search(query, k=1, nprobe=nprobe)
+                times.append(time.perf_counter() - start)
+
+                found = result[0] if result else (None, float('inf'))
+                hits += found[0] == keys[best]
+                decisions += (found[1] <= TOLERANCE) == (distance <= TOLERANCE)
+
+            report['ivf'].append({
+                'nlist': nlist,
+                'nprobe': nprobe,
+                'build_s': round(build_s, 3),
+                'recall_at_1': round(hits / len(queries), 4),
+                'decision_agreement': round(decisions / len(queries), 4),
+                'p50_ms': percentile_ms(times, 50),
+                'p95_ms': percentile_ms(times, 95)
+            })
+
+    return report
+
+
+def print_table(report):
+    print(f"Gallery: {report['gallery_size']} encodings, {report['queries']} queries")
+    print(f"Flat scan: p50 {report['flat']['p50_ms']} ms, p95 {report['flat']['p95_ms']} ms\n")
+    print(f"{'nlist':>6} {'nprobe':>6} {'recall@1':>9} {'decision':>9} {'p50 ms':>8} {'p95 ms':>8} {'build s':>8}")
+    for row in report['ivf']:
+        print(f"{row['nlist']:>6} {row['nprobe']:>6} {row['recall_at_1']:>9} {row['decision_agreement']:>9} "
+              f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['build_s']:>8}")
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=20000, help='Jumlah encodings sintetis')
+    parser.add_argument('--input', help='File .npy (N x 128) berisi encodings asli')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--nlist', type=int_list, default=[64, 141, 256])
+    parser.add_argument('--nprobe', type=int_list, default=[1, 4, 8, 16])
+    parser.add_argument('--json', action='store_true', help='Output JSON')
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_table(report)
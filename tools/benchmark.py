@@ -0,0 +1,214 @@
+"""
+Micro-benchmark per stage untuk hot path app_face_recognition.py.
+
+Jalan offline: Firebase diganti FakeDatabase in-memory (tools/fake_rtdb.py),
+image sintetis atau file yang diberikan lewat --image.
+
+Usage:
+    python tools/benchmark.py --output bench.json
+    python tools/benchmark.py --save-baseline bench_baseline.json
+    python tools/benchmark.py --compare bench_baseline.json --threshold 0.2
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmark tidak butuh background threads dan batching
+os.environ.setdefault('GALLERY_REFRESH_INTERVAL', '0')
+os.environ.setdefault('RECOGNITION_BATCH_WINDOW_MS', '0')
+os.environ.setdefault('FRAME_CACHE_TTL', '0')
+os.environ.setdefault('INFERENCE_WORKERS', '0')
+os.environ.setdefault('STORAGE_BACKEND', 'firebase')
+os.environ.setdefault('LOG_RETENTION_DAYS', '0')
+os.environ.setdefault('LOG_SPOOL_PATH', os.path.join(ROOT, 'bench_spool.jsonl'))
+
+import cv2
+
+import fake_rtdb
+
+database = fake_rtdb.install()
+
+import app_face_recognition as server
+import face_engine
+from encoding_codec import pack_encoding
+from face_gallery import FaceGallery
+
+
+def timed(fn, repeat, warmup=2):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def summarize(samples):
+    ms = np.array(samples) * 1000
+    return {
+        'runs': len(ms),
+        'mean_ms': round(float(ms.mean()), 4),
+        'p50_ms': round(float(np.percentile(ms, 50)), 4),
+        'p95_ms': round(float(np.percentile(ms, 95)), 4),
+        'p99_ms': round(float(np.percentile(ms, 99)), 4)
+    }
+
+
+def synthetic_frame(width=640, height=480, seed=0):
+    """Frame sintetis dengan tekstur, ukuran default sama dengan VGA ESP32-CAM"""
+    rng = np.random.default_rng(seed)
+    frame = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (9, 9), 0)
+    cv2.ellipse(frame, (width // 2, height // 2), (width // 8, height // 5), 0, 0, 360, (150, 170, 200), -1)
+    return frame
+
+
+def fake_users(count, seed=0):
+    rng = np.random.default_rng(seed)
+    encodings = rng.normal(0, 0.09, (count, 128))
+    return {
+        f"user_{i:06d}": {
+            'name': f"User {i}",
+            'email': '',
+            'phone': '',
+            'face_encoding': encodings[i].tolist(),
+            'status': 'active',
+            'model': 'face_recognition'
+        }
+        for i in range(count)
+    }
+
+
+def run(args):
+    # Tunggu warm-up model di background selesai supaya tidak rebutan CPU dengan stage yang diukur
+    server.startup.wait()
+
+    frame = cv2.imread(args.image) if args.image else synthetic_frame()
+    jpeg = cv2.imencode('.jpg', frame)[1].tobytes()
+    jpeg_b64 = base64.b64encode(jpeg).decode()
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    height, width = frame.shape[:2]
+    face_box = (height // 4, 3 * width // 4, 3 * height // 4, width // 4)
+    results = {}
+
+    results['decode_image_base64'] = timed(lambda: server.decode_image(jpeg_b64), args.repeat)
+    results['decode_image_bytes'] = timed(lambda: server.decode_image_bytes(jpeg), args.repeat)
+    results['bgr_to_rgb'] = timed(lambda: cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), args.repeat)
+
+    fr = face_engine.load_models()
+    results['hog_detection'] = timed(lambda: fr.face_locations(rgb, model='hog'), args.slow_repeat)
+    results['encoding'] = timed(lambda: fr.face_encodings(rgb, [face_box]), args.slow_repeat)
+    results['get_face_encoding'] = timed(lambda: face_engine.get_face_encoding(frame), args.slow_repeat)
+
+    users_ref = database.reference('users')
+    users_ref.set(fake_users(args.load_users))
+    gallery = FaceGallery(users_ref, refresh_interval=0)
+    results[f'load_known_faces_{args.load_users}'] = timed(gallery.load, max(3, args.slow_repeat))
+
+    users_ref.set({user_id: {**user, 'face_encoding': pack_encoding(user['face_encoding'])}
+                   for user_id, user in fake_users(args.load_users).items()})
+    results[f'load_known_faces_packed_{args.load_users}'] = timed(gallery.load, max(3, args.slow_repeat))
+
+    query = np.random.default_rng(1).normal(0, 0.09, 128)
+    for size in args.gallery_sizes:
+        gallery_ref = database.reference(f'bench_gallery_{size}')
+        gallery_ref.set(fake_users(size))
+        sized = FaceGallery(gallery_ref, refresh_interval=0)
+        sized.load()
+        results[f'gallery_match_{size}'] = timed(lambda: sized.match(query, server.TOLERANCE), args.repeat)
+        gallery_ref.delete()
+
+    database.reference('pins').set({
+        f"pin_{i:06d}": {'pin': f"{i % 10000:04d}", 'user_name': f"PIN {i}", 'status': 'active'}
+        for i in range(args.pins)
+    })
+    server.pin_index.load()
+    results[f'pin_lookup_{args.pins}'] = timed(lambda: server.pin_index.verify('99999'), args.repeat)
+
+    log_entry = {'timestamp': '2025-01-01T00:00:00', 'authorized': False, 'user_id': 'unknown',
+                 'user_name': 'Unknown', 'confidence': 0}
+    results['log_write_enqueue'] = timed(lambda: server.log_writer.write(log_entry), args.repeat)
+    results['log_write_direct'] = timed(lambda: server.logs_ref.push(log_entry), args.repeat)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'frame': f"{width}x{height}",
+            'image': args.image or 'synthetic'
+        },
+        'stages': results
+    }
+
+
+def compare(report, baseline, threshold, metric, min_delta_ms):
+    """
+    Return list stage yang lebih lambat dari baseline lebih dari threshold
+    (relatif) dan lebih dari min_delta_ms (absolut, supaya noise di stage
+    yang hanya beberapa mikrodetik tidak dianggap regresi).
+    """
+    regressions = []
+    for stage, current in report['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if not previous or not previous.get(metric):
+            continue
+        change = (current[metric] - previous[metric]) / previous[metric]
+        regressed = change > threshold and current[metric] - previous[metric] > min_delta_ms
+        status = 'REGRESSION' if regressed else 'ok'
+        print(f"{stage:<28} {previous[metric]:>10.4f} -> {current[metric]:>10.4f} ms  {change:+7.1%}  {status}")
+        if regressed:
+            regressions.append(stage)
+    return regressions
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', help='Foto wajah untuk stage detection/encoding (default: frame sintetis)')
+    parser.add_argument('--repeat', type=int, default=200, help='Jumlah run untuk stage cepat')
+    parser.add_argument('--slow-repeat', type=int, default=20, help='Jumlah run untuk stage dlib')
+    parser.add_argument('--load-users', type=int, default=1000)
+    parser.add_argument('--gallery-sizes', type=int_list, default=[10, 1000, 100000])
+    parser.add_argument('--pins', type=int, default=1000)
+    parser.add_argument('--output', help='Tulis report JSON ke file ini (default: stdout)')
+    parser.add_argument('--save-baseline', help='Simpan report sebagai baseline')
+    parser.add_argument('--compare', help='Baseline JSON untuk dibandingkan')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Batas regresi relatif (0.2 = 20%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help='Selisih absolut minimum untuk regresi')
+    parser.add_argument('--metric', default='p50_ms', choices=['p50_ms', 'p95_ms', 'p99_ms', 'mean_ms'])
+    args = parser.parse_args()
+
+    report = run(args)
+    server.log_writer.stop(timeout=0)
+    if os.path.exists(os.environ['LOG_SPOOL_PATH']):
+        os.remove(os.environ['LOG_SPOOL_PATH'])
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+    if not args.output and not args.compare:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.metric, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions")
@@ -0,0 +1,103 @@
+"""
+Stand-in in-memory untuk Firebase RTDB (subset API firebase_admin.db.Reference
+yang dipakai server), supaya benchmark bisa jalan offline tanpa
+serviceAccountKey.json.
+"""
+import copy
+import itertools
+
+_counter = itertools.count()
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.root = {}
+
+    def reference(self, path='/'):
+        return FakeReference(self, path)
+
+
+class FakeReference:
+    def __init__(self, database, path):
+        self._db = database
+        self.path = '/' + path.strip('/')
+        self._order_by = None
+        self._limit_last = None
+
+    @property
+    def key(self):
+        parts = self._parts()
+        return parts[-1] if parts else None
+
+    def _parts(self):
+        return [p for p in self.path.split('/') if p]
+
+    def child(self, path):
+        return FakeReference(self._db, f"{self.path.rstrip('/')}/{path}")
+
+    def get(self):
+        node = self._db.root
+        for part in self._parts():
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        node = copy.deepcopy(node)
+
+        if isinstance(node, dict) and self._order_by is not None:
+            items = sorted(node.items(), key=lambda item: item[1].get(self._order_by, ''))
+            if self._limit_last:
+                items = items[-self._limit_last:]
+            node = dict(items)
+        return node
+
+    def set(self, value):
+        parts = self._parts()
+        if not parts:
+            self._db.root = copy.deepcopy(value) if value is not None else {}
+            return
+        node = self._db.root
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = copy.deepcopy(value)
+
+    def update(self, value):
+        for path, child_value in value.items():
+            self.child(path).set(child_value)
+
+    def delete(self):
+        self.set(None)
+
+    def push(self, value=''):
+        ref = self.child(f"-fake{next(_counter):012d}")
+        ref.set(value)
+        return ref
+
+    def order_by_child(self, name):
+        ref = FakeReference(self._db, self.path)
+        ref._order_by = name
+        return ref
+
+    def limit_to_last(self, limit):
+        self._limit_last = limit
+        return self
+
+    def listen(self, callback):
+        raise RuntimeError('FakeReference does not support listeners')
+
+
+def install(database=None):
+    """
+    Patch firebase_admin supaya initialize_app/credentials/db.reference memakai
+    FakeDatabase. Harus dipanggil sebelum import app_face_recognition.
+    """
+    import firebase_admin
+    from firebase_admin import credentials, db
+
+    database = database or FakeDatabase()
+    firebase_admin.initialize_app = lambda *args, **kwargs: None
+    credentials.Certificate = lambda *args, **kwargs: None
+    db.reference = database.reference
+    return database
@@ -0,0 +1,78 @@
+"""
+Migrasi face_encoding user dari JSON list (format lama) ke format packed
+(lihat encoding_codec). Record yang sudah packed dilewati, jadi aman
+dijalankan berulang kali.
+
+Usage:
+    python tools/migrate_encodings.py --dry-run
+    python tools/migrate_encodings.py --format f16
+    python tools/migrate_encodings.py --backend firebase --credentials serviceAccountKey.json
+"""
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from encoding_codec import DTYPES, is_packed, pack_encoding
+
+DEFAULT_DATABASE_URL = 'https://iot-rc-ef82d-default-rtdb.asia-southeast1.firebasedatabase.app/'
+
+
+def users_reference(args):
+    if args.backend == 'local':
+        from local_store import LocalStore
+        # Perubahan masuk outbox, dikirim ke Firebase oleh server saat sync berikutnya
+        return LocalStore(args.db).reference('users')
+
+    import firebase_admin
+    from firebase_admin import credentials, db
+    firebase_admin.initialize_app(credentials.Certificate(args.credentials), {'databaseURL': args.database_url})
+    return db.reference('users')
+
+
+def migrate(users_ref, fmt, batch_size, dry_run):
+    users = users_ref.get() or {}
+    pending = {}
+    stats = {'users': len(users), 'migrated': 0, 'already_packed': 0, 'without_encoding': 0,
+             'bytes_before': 0, 'bytes_after': 0}
+
+    for user_id, user_data in users.items():
+        encoding = user_data.get('face_encoding') if isinstance(user_data, dict) else None
+        if encoding is None:
+            stats['without_encoding'] += 1
+            continue
+        if is_packed(encoding):
+            stats['already_packed'] += 1
+            continue
+
+        packed = pack_encoding(encoding, fmt)
+        stats['bytes_before'] += len(json.dumps(encoding))
+        stats['bytes_after'] += len(json.dumps(packed))
+        pending[f"{user_id}/face_encoding"] = packed
+        stats['migrated'] += 1
+
+        if len(pending) >= batch_size and not dry_run:
+            users_ref.update(pending)
+            pending = {}
+
+    if pending and not dry_run:
+        users_ref.update(pending)
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', default=os.environ.get('STORAGE_BACKEND', 'local'), choices=['local', 'firebase'])
+    parser.add_argument('--db', default=os.environ.get('LOCAL_DB_PATH', 'face_server.db'))
+    parser.add_argument('--credentials', default=os.environ.get('FIREBASE_CREDENTIALS', 'serviceAccountKey.json'))
+    parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL)
+    parser.add_argument('--format', default=os.environ.get('ENCODING_FORMAT', 'f32'), choices=sorted(DTYPES))
+    parser.add_argument('--batch-size', type=int, default=200, help='Jumlah user per multi-path update')
+    parser.add_argument('--dry-run', action='store_true', help='Hitung saja, tanpa menulis')
+    args = parser.parse_args()
+
+    stats = migrate(users_reference(args), args.format, args.batch_size, args.dry_run)
+    print(json.dumps(stats, indent=2))
@@ -0,0 +1,111 @@
+"""
+Stand-in lokal untuk endpoint /stream ESP32-CAM: MJPEG multipart dengan
+boundary dan header yang sama seperti esp32_cam_dashboard_ready.ino.
+
+Frame diambil dari file JPEG di --images (diputar berulang), atau frame
+sintetis dengan kotak bergerak kalau tidak diberikan.
+
+Usage:
+    python tools/mjpeg_server.py --port 8081 --fps 10
+    python tools/mjpeg_server.py --images ./faces --fps 5
+
+Lalu jalankan server dengan STREAM_URLS=cam1=http://127.0.0.1:8081/stream
+"""
+import argparse
+import glob
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+PART_BOUNDARY = '123456789000000000000987654321'
+
+
+def synthetic_frames(width=640, height=480):
+    step = 0
+    while True:
+        frame = np.full((height, width, 3), 90, dtype=np.uint8)
+        x = (step * 15) % (width - 120)
+        cv2.rectangle(frame, (x, height // 3), (x + 120, height // 3 + 160), (150, 170, 200), -1)
+        cv2.putText(frame, str(step), (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        yield cv2.imencode('.jpg', frame)[1].tobytes()
+        step += 1
+
+
+def file_frames(directory):
+    paths = sorted(glob.glob(os.path.join(directory, '*.jpg')) + glob.glob(os.path.join(directory, '*.jpeg')))
+    if not paths:
+        raise SystemExit(f"No JPEG files in {directory}")
+    frames = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            frames.append(f.read())
+    while True:
+        yield from frames
+
+
+class MjpegServer:
+    def __init__(self, host='127.0.0.1', port=0, fps=10.0, images=None):
+        self.fps = fps
+        self._images = images
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/stream"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        stream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/stream':
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', f'multipart/x-mixed-replace;boundary={PART_BOUNDARY}')
+                self.end_headers()
+
+                frames = file_frames(stream._images) if stream._images else synthetic_frames()
+                try:
+                    for jpeg in frames:
+                        self.wfile.write(f'\r\n--{PART_BOUNDARY}\r\n'.encode())
+                        self.wfile.write(f'Content-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n'.encode())
+                        self.wfile.write(jpeg)
+                        time.sleep(1 / stream.fps)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, fmt, *args):
+                print(f"[mjpeg] {self.address_string()} {fmt % args}")
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--fps', type=float, default=10.0)
+    parser.add_argument('--images', help='Folder JPEG yang diputar berulang (default: frame sintetis)')
+    args = parser.parse_args()
+
+    server = MjpegServer(args.host, args.port, args.fps, args.images)
+    print(f"MJPEG stream on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass